@@ -2,16 +2,18 @@ from datetime import datetime, timedelta, timezone
 import logging
 import random
 import string
-from fastapi import APIRouter, Depends, Form, HTTPException, Request, BackgroundTasks
+from fastapi import APIRouter, Depends, Form, HTTPException, Request
 
 logger = logging.getLogger(__name__)
 from fastapi.responses import RedirectResponse, JSONResponse
 from sqlalchemy.orm import Session
 
 from app.db import models
-from app.core import security
-from app.core.email_utils import send_otp_email, send_password_changed_email
-from app.api.deps import get_db, get_current_org
+from app.core import rate_limit, security, tokens
+from app.core.config import settings
+from app.core.email_utils import queue_otp_email, queue_password_changed_email
+from app.workers import outbox
+from app.api.deps import get_db, get_current_org, invalidate_org, token_from_request
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -20,6 +22,19 @@ def _generate_otp() -> str:
     return ''.join(random.choices(string.digits, k=6))
 
 
+def _check_otp(db: Session, org: models.Organization, code: str, invalid_detail: str):
+    # Each OTP accepts a bounded number of wrong guesses; after that a new one must be requested
+    if (org.otp_attempts or 0) >= settings.OTP_MAX_ATTEMPTS:
+        raise HTTPException(status_code=429, detail="Too many incorrect codes. Please request a new OTP.")
+    if org.otp != code:
+        db.query(models.Organization).filter(models.Organization.id == org.id).update(
+            {models.Organization.otp_attempts: models.Organization.otp_attempts + 1},
+            synchronize_session=False,
+        )
+        db.commit()
+        raise HTTPException(status_code=400, detail=invalid_detail)
+
+
 def _random_password(length: int = 8) -> str:
     alphabet = string.ascii_letters + string.digits
     return ''.join(random.choice(alphabet) for _ in range(length))
@@ -27,7 +42,7 @@ def _random_password(length: int = 8) -> str:
 
 @router.post("/register")
 def register(
-    background_tasks: BackgroundTasks,
+    request: Request,
     name: str = Form(...),
     contact_email: str = Form(...),
     password: str = Form(...),
@@ -37,6 +52,7 @@ def register(
     db: Session = Depends(get_db)
 ):
     contact_email = contact_email.lower().strip()
+    rate_limit.enforce("email_send", request, contact_email)
     # Check if organization already exists
     existing_org = db.query(models.Organization).filter(models.Organization.contact_email == contact_email).first()
     existing_user = db.query(models.User).filter(models.User.email == contact_email).first()
@@ -45,17 +61,20 @@ def register(
         # If it's already verified or active, we don't allow re-registration
         if existing_org.status and existing_org.status.lower() in ("active", "approved"):
             raise HTTPException(status_code=400, detail="Organization already registered and approved.")
+
+        # Hash once and reuse it for both the user and organization rows
+        password_hash = security.get_password_hash(password)
         
         # If it's unverified (pending), UPDATE the existing records instead of deleting
         # This avoids unique constraint violations
         if existing_user:
-            existing_user.hashed_password = security.get_password_hash(password)
+            existing_user.hashed_password = password_hash
             existing_user.full_name = name
             existing_user.is_verified = False
         else:
             existing_user = models.User(
                 email=contact_email,
-                hashed_password=security.get_password_hash(password),
+                hashed_password=password_hash,
                 full_name=name,
                 role="organization",
                 is_verified=False
@@ -64,7 +83,8 @@ def register(
             db.flush()
         
         # Update organization
-        existing_org.password = security.get_password_hash(password)
+        existing_org.password = password_hash
+        existing_org.token_version = (existing_org.token_version or 0) + 1
         
         # Update organization with new data
         otp = _generate_otp()
@@ -77,20 +97,24 @@ def register(
         existing_org.status = "pending"
         existing_org.otp = otp
         existing_org.otp_expires = expires_at
+        existing_org.otp_attempts = 0
         existing_org.must_change_password = False
         
-        # Commit first
+        # The OTP email is committed together with the OTP itself
+        queue_otp_email(db, contact_email, otp)
+        org_id = existing_org.id
         db.commit()
-        
-        # Then send email in background
-        background_tasks.add_task(send_otp_email, contact_email, otp)
+        invalidate_org(org_id)
+        outbox.wake()
         
         return {"message": "OTP sent successfully", "email": contact_email}
 
+    password_hash = security.get_password_hash(password)
+
     # No existing org - but check if user exists
     if existing_user:
         # Update existing user
-        existing_user.hashed_password = security.get_password_hash(password)
+        existing_user.hashed_password = password_hash
         existing_user.full_name = name
         existing_user.is_verified = False
         user_id = existing_user.id
@@ -98,7 +122,7 @@ def register(
         # Create new user
         user = models.User(
             email=contact_email,
-            hashed_password=security.get_password_hash(password),
+            hashed_password=password_hash,
             full_name=name,
             role="organization",
             is_verified=False
@@ -115,7 +139,7 @@ def register(
         user_id=user_id,
         name=name,
         contact_email=contact_email,
-        password=security.get_password_hash(password),
+        password=password_hash,
         country=country,
         type=org_type,
         website=website,
@@ -125,18 +149,18 @@ def register(
         must_change_password=False # User set it themselves
     )
     db.add(org)
+    queue_otp_email(db, contact_email, otp)
 
-    db.commit() # Save everything first
-    
-    # Send email in background
-    background_tasks.add_task(send_otp_email, contact_email, otp)
+    db.commit() # Save everything, including the outbox row, in one transaction
+    outbox.wake()
 
     return {"message": "OTP sent successfully", "email": contact_email}
 
 
 @router.post("/resend-otp")
-def resend_otp(background_tasks: BackgroundTasks, email: str = Form(...), db: Session = Depends(get_db)):
+def resend_otp(request: Request, email: str = Form(...), db: Session = Depends(get_db)):
     email = email.lower().strip()
+    rate_limit.enforce("email_send", request, email)
     org = db.query(models.Organization).filter(models.Organization.contact_email == email).first()
     if not org:
         raise HTTPException(status_code=404, detail="Organization not found")
@@ -148,18 +172,22 @@ def resend_otp(background_tasks: BackgroundTasks, email: str = Form(...), db: Se
     otp = _generate_otp()
     org.otp = otp
     org.otp_expires = datetime.now(timezone.utc) + timedelta(minutes=10)
+    org.otp_attempts = 0
+    queue_otp_email(db, email, otp)
     db.commit()
-    background_tasks.add_task(send_otp_email, email, otp)
+    outbox.wake()
     return {"message": "OTP resent successfully"}
 
 
 @router.post("/verify")
 def verify_otp(
+    request: Request,
     email: str = Form(...),
     code: str = Form(...),
     db: Session = Depends(get_db)
 ):
     email = email.lower().strip()
+    rate_limit.enforce("otp", request, email)
     org = db.query(models.Organization).filter(models.Organization.contact_email == email).first()
     if not org:
         raise HTTPException(status_code=404, detail="Organization not found")
@@ -167,14 +195,14 @@ def verify_otp(
     if not org.otp or not org.otp_expires:
         raise HTTPException(status_code=400, detail="OTP not found. Please re-register.")
 
-    if org.otp != code:
-        raise HTTPException(status_code=400, detail="Invalid OTP")
+    _check_otp(db, org, code, "Invalid OTP")
 
     if datetime.now(timezone.utc) > org.otp_expires:
         raise HTTPException(status_code=400, detail="OTP expired")
 
     org.otp = None
     org.otp_expires = None
+    org.otp_attempts = 0
 
     user = db.query(models.User).filter(models.User.id == org.user_id).first()
     if user:
@@ -187,11 +215,13 @@ def verify_otp(
 
 @router.post("/login")
 def login(
+    request: Request,
     email: str = Form(...),
     password: str = Form(...),
     db: Session = Depends(get_db)
 ):
     email = email.lower().strip()
+    rate_limit.enforce("login", request, email)
     org = db.query(models.Organization).filter(models.Organization.contact_email == email).first()
     if not org:
         logger.warning(f"Login failed: Organization not found for email: {email}")
@@ -202,7 +232,7 @@ def login(
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
     logger.info(f"Login successful for organization: {email}")
-    token = security.create_access_token(subject=org.contact_email, org_id=org.id, role="organization")
+    token = tokens.issue_token(org)
     
     # Return different status depending on approval
     redirect_target = "dashboard"
@@ -223,7 +253,6 @@ def login(
 
 @router.post("/change-password")
 def change_password(
-    background_tasks: BackgroundTasks,
     old_password: str = Form(...),
     new_password: str = Form(...),
     db: Session = Depends(get_db),
@@ -232,22 +261,34 @@ def change_password(
     if not security.verify_password(old_password, org.password or ""):
         raise HTTPException(status_code=400, detail="Old password incorrect")
 
-    org.password = security.get_password_hash(new_password)
+    password_hash = security.get_password_hash(new_password)
+    org.password = password_hash
     org.must_change_password = False
+    org.token_version = (org.token_version or 0) + 1
 
     user = db.query(models.User).filter(models.User.id == org.user_id).first()
     if user:
-        user.hashed_password = security.get_password_hash(new_password)
+        user.hashed_password = password_hash
 
+    queue_password_changed_email(db, org.contact_email)
+    org_id = org.id
     db.commit()
-
-    background_tasks.add_task(send_password_changed_email, org.contact_email)
+    invalidate_org(org_id)
+    outbox.wake()
 
     return {"message": "Password changed successfully"}
 
 
+@router.post("/logout")
+# GET kept for clients that still log out with a plain link; it revokes the token the same way
 @router.get("/logout")
-def logout():
+def logout(request: Request, db: Session = Depends(get_db)):
+    token = token_from_request(request)
+    if token:
+        try:
+            tokens.revoke(db, tokens.decode_token(token))
+        except tokens.InvalidToken:
+            pass
     resp = JSONResponse(content={"message": "Logged out"})
     resp.delete_cookie(
         "org_token",
@@ -258,8 +299,9 @@ def logout():
 
 
 @router.post("/forgot-password/request")
-def forgot_password_request(background_tasks: BackgroundTasks, email: str = Form(...), db: Session = Depends(get_db)):
+def forgot_password_request(request: Request, email: str = Form(...), db: Session = Depends(get_db)):
     email = email.lower().strip()
+    rate_limit.enforce("email_send", request, email)
     org = db.query(models.Organization).filter(models.Organization.contact_email == email).first()
     if not org:
         logger.info(f"Forgot password request: Email not found in database: {email}")
@@ -270,36 +312,45 @@ def forgot_password_request(background_tasks: BackgroundTasks, email: str = Form
     otp = _generate_otp()
     org.otp = otp
     org.otp_expires = datetime.now(timezone.utc) + timedelta(minutes=10)
+    org.otp_attempts = 0
+    logger.info(f"Queueing OTP email to {email}")
+    queue_otp_email(db, email, otp)
     db.commit()
-    
-    logger.info(f"Adding background task to send OTP to {email}")
-    background_tasks.add_task(send_otp_email, email, otp)
+    outbox.wake()
 
     return {"message": "If this email is registered, an OTP has been sent."}
 
 
 @router.post("/forgot-password/reset")
 def forgot_password_reset(
+    request: Request,
     email: str = Form(...),
     otp: str = Form(...),
     new_password: str = Form(...),
     db: Session = Depends(get_db)
 ):
     email = email.lower().strip()
+    rate_limit.enforce("otp", request, email)
     org = db.query(models.Organization).filter(models.Organization.contact_email == email).first()
-    if not org or org.otp != otp:
+    if not org or not org.otp:
         raise HTTPException(status_code=400, detail="Invalid OTP or email")
+    _check_otp(db, org, otp, "Invalid OTP or email")
 
     if not org.otp_expires or datetime.now(timezone.utc) > org.otp_expires:
         raise HTTPException(status_code=400, detail="OTP expired")
 
-    org.password = security.get_password_hash(new_password)
+    password_hash = security.get_password_hash(new_password)
+    org.password = password_hash
+    org.token_version = (org.token_version or 0) + 1
     org.otp = None
     org.otp_expires = None
+    org.otp_attempts = 0
     
     user = db.query(models.User).filter(models.User.id == org.user_id).first()
     if user:
-        user.hashed_password = security.get_password_hash(new_password)
+        user.hashed_password = password_hash
 
+    org_id = org.id
     db.commit()
+    invalidate_org(org_id)
     return {"message": "Password reset successfully"}
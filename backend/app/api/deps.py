@@ -1,8 +1,12 @@
 from fastapi import Depends, HTTPException, Request
-from jose import jwt, JWTError
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.core.config import settings
-from app.db.session import SessionLocal
+from app.core import tokens
+from app.core.cache import org_cache
+from app.db import replicas
+from app.db.session import AsyncSessionLocal, SessionLocal
 from app.db import models
 
 
@@ -14,29 +18,136 @@ def get_db():
         db.close()
 
 
-def get_current_org(request: Request, db: Session = Depends(get_db)) -> models.Organization:
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_read_db(request: Request):
+    # Replica session for read-only routes, unless this org wrote recently or the client asks for the primary
+    force_primary = request.headers.get("x-read-primary") == "1"
+    org_id = None
+    if replicas.replicas and not force_primary:
+        org_id = _claims_from_request(request).org_id
+    sessionmaker = await replicas.read_sessionmaker(org_id, force_primary)
+    async with sessionmaker() as db:
+        yield db
+
+
+def token_from_request(request: Request) -> str | None:
     token = request.cookies.get("org_token")
-    
+
     # Check Authorization header if cookie is missing
     auth_header = request.headers.get("Authorization")
     if not token and auth_header and auth_header.startswith("Bearer "):
         token = auth_header.split(" ")[1]
+    return token
+
 
+def claims_from_token(token: str | None) -> tokens.TokenClaims:
     if not token:
         raise HTTPException(status_code=401, detail="Not authenticated")
-
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-    except JWTError:
+        claims = tokens.decode_token(token)
+    except tokens.InvalidToken:
         raise HTTPException(status_code=401, detail="Invalid token")
+    if tokens.revocations.is_revoked(claims):
+        raise HTTPException(status_code=401, detail="Token revoked")
+    return claims
 
-    org_id = payload.get("org_id")
-    if not org_id:
-        raise HTTPException(status_code=401, detail="Invalid token")
 
-    org = db.query(models.Organization).filter(models.Organization.id == org_id).first()
+def _claims_from_request(request: Request) -> tokens.TokenClaims:
+    claims = getattr(request.state, "claims", None)
+    if claims is not None:
+        return claims
+
+    claims = claims_from_token(token_from_request(request))
+    request.state.claims = claims
+    return claims
+
+
+def _check_token_version(claims: tokens.TokenClaims, current_version: int | None):
+    if claims.version is not None and claims.version < (current_version or 0):
+        raise HTTPException(status_code=401, detail="Token revoked")
+
+
+def get_current_org(request: Request, db: Session = Depends(get_db)) -> models.Organization:
+    claims = _claims_from_request(request)
+
+    org = db.query(models.Organization).filter(models.Organization.id == claims.org_id).first()
     if not org:
         raise HTTPException(status_code=404, detail="Organization not found")
+    _check_token_version(claims, org.token_version)
 
     # We allow the object to be returned even if pending/rejected so the frontend can show the status
     return org
+
+
+PRINCIPAL_FIELDS = (
+    "id", "user_id", "name", "contact_email", "country", "type", "website", "status", "must_change_password",
+    "token_version",
+)
+
+
+class OrgPrincipal:
+    # Read-only snapshot of the caller's organization; credentials and OTP state are never cached.
+    __slots__ = PRINCIPAL_FIELDS
+
+    def __init__(self, data: dict):
+        for field in PRINCIPAL_FIELDS:
+            setattr(self, field, data.get(field))
+
+    @staticmethod
+    def snapshot(org: models.Organization) -> dict:
+        return {field: getattr(org, field) for field in PRINCIPAL_FIELDS}
+
+
+def invalidate_org(org_id: int):
+    org_cache.invalidate(org_id)
+    tokens.revocations.forget(org_id)
+
+
+async def get_current_org_async(request: Request, db: AsyncSession = Depends(get_async_db)) -> OrgPrincipal:
+    principal = getattr(request.state, "org", None)
+    if principal is not None:
+        return principal
+
+    claims = _claims_from_request(request)
+    org_id = claims.org_id
+
+    data = org_cache.get_local(org_id)
+    if data is None and org_cache.shared:
+        data = await run_in_threadpool(org_cache.get, org_id)
+
+    if data is None:
+        result = await db.execute(select(models.Organization).where(models.Organization.id == org_id))
+        org = result.scalar_one_or_none()
+        if not org:
+            raise HTTPException(status_code=404, detail="Organization not found")
+        data = OrgPrincipal.snapshot(org)
+        if org_cache.shared:
+            await run_in_threadpool(org_cache.set, org_id, data)
+        else:
+            org_cache.set(org_id, data)
+
+    _check_token_version(claims, data.get("token_version"))
+    principal = OrgPrincipal(data)
+    request.state.org = principal
+    return principal
+
+
+async def get_org_from_token(request: Request, db: AsyncSession = Depends(get_async_db)) -> OrgPrincipal:
+    # Fast path for routes that only need id/user_id/name/contact_email/status/must_change_password:
+    # while the token's snapshot still matches the worker's revocation map, no org lookup is made.
+    claims = _claims_from_request(request)
+    if not tokens.revocations.is_fresh(claims):
+        return await get_current_org_async(request, db)
+    return OrgPrincipal({
+        "id": claims.org_id,
+        "user_id": claims.user_id,
+        "name": claims.name,
+        "contact_email": claims.subject,
+        "status": claims.status,
+        "must_change_password": claims.must_change_password,
+        "token_version": claims.version,
+    })
@@ -1,24 +1,537 @@
-from fastapi import APIRouter, Depends, Form, HTTPException
-from sqlalchemy.orm import Session
+import asyncio
+import base64
+import csv
+import io
+import json
+import logging
+import orjson
+import time
+from fastapi import APIRouter, Depends, File, Form, Header, HTTPException, Query, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import and_, delete, func, literal, literal_column, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 
+from app.core import tokens
+from app.core.config import settings
+from app.core.events import broker
 from app.db import models
-from app.api.deps import get_db, get_current_org
+from app.db.replicas import pin_primary, read_sessionmaker
+from app.db.session import AsyncSessionLocal
+from app.api.deps import (
+    OrgPrincipal, get_async_db, get_current_org_async, get_org_from_token, get_read_db,
+)
+from app.schemas.grant import GrantIdList, GrantImportRow, GrantPage, naive_utc
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/org/grants", tags=["org-grants"])
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+MAX_SEARCH_RESULTS = 100
+
+IMPORT_BATCH_SIZE = 500
+MAX_IMPORT_ROWS = 50000
+MAX_IMPORT_ERRORS = 200
+# Columns an import may set or overwrite on an existing row with the same external_id
+IMPORT_FIELDS = (
+    "title", "organizer", "apply_url", "deadline", "description",
+    "eligibility", "refugee_country", "amount", "category",
+)
+
+# Columns returned by the lightweight listing; "full" adds the long text columns
+SUMMARY_COLUMNS = (
+    models.Grant.id,
+    models.Grant.title,
+    models.Grant.organizer,
+    models.Grant.is_active,
+    models.Grant.status,
+    models.Grant.amount,
+    models.Grant.deadline,
+    models.Grant.apply_url,
+    models.Grant.refugee_country,
+    models.Grant.category,
+    models.Grant.created_at,
+)
+FULL_COLUMNS = SUMMARY_COLUMNS + (models.Grant.description, models.Grant.eligibility)
+EXPORT_COLUMNS = FULL_COLUMNS + (models.Grant.external_id, models.Grant.updated_at)
+EXPORT_FETCH_SIZE = 500
+
 
 def _parse_deadline(value: str | None):
     if not value:
         return None
     try:
-        return datetime.fromisoformat(value)
+        return naive_utc(datetime.fromisoformat(value))
     except ValueError:
         return None
 
 
+def encode_cursor(created_at: datetime, grant_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{grant_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, grant_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(grant_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _grant_row_to_dict(row) -> dict:
+    data = dict(row._mapping)
+    data["status"] = data["status"] or "LIVE"
+    data.pop("created_at", None)
+    return data
+
+
+def _grant_filters(
+    org_id: int,
+    *,
+    status: str | None = None,
+    trash: bool | None = None,
+    active: bool | None = None,
+    category: str | None = None,
+    refugee_country: str | None = None,
+    deadline_from: datetime | None = None,
+    deadline_to: datetime | None = None,
+) -> list:
+    criteria = [models.Grant.organization_id == org_id]
+    if status:
+        if status.upper() == "LIVE":
+            criteria.append(or_(models.Grant.status == "LIVE", models.Grant.status.is_(None)))
+        else:
+            criteria.append(models.Grant.status == status.upper())
+    if trash is True:
+        criteria.append(models.Grant.status == "DELETION_PENDING")
+    elif trash is False:
+        criteria.append(or_(models.Grant.status != "DELETION_PENDING", models.Grant.status.is_(None)))
+    if active is not None:
+        criteria.append(models.Grant.is_active.is_(active))
+    if category:
+        criteria.append(models.Grant.category == category)
+    if refugee_country:
+        criteria.append(models.Grant.refugee_country == refugee_country)
+    if deadline_from:
+        criteria.append(models.Grant.deadline >= naive_utc(deadline_from))
+    if deadline_to:
+        criteria.append(models.Grant.deadline <= naive_utc(deadline_to))
+    return criteria
+
+
+async def list_org_grants(
+    db: AsyncSession,
+    org_id: int,
+    *,
+    cursor: str | None = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    full: bool = False,
+    **filters,
+):
+    # Keyset pagination on (created_at DESC, id DESC), served by ix_grants_org_status_active_created
+    criteria = _grant_filters(org_id, **filters)
+    if cursor:
+        after_created, after_id = decode_cursor(cursor)
+        criteria.append(or_(
+            models.Grant.created_at < after_created,
+            and_(models.Grant.created_at == after_created, models.Grant.id < after_id),
+        ))
+
+    result = await db.execute(
+        select(*(FULL_COLUMNS if full else SUMMARY_COLUMNS))
+        .where(*criteria)
+        .order_by(models.Grant.created_at.desc(), models.Grant.id.desc())
+        .limit(limit + 1)
+    )
+    rows = result.all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return [_grant_row_to_dict(row) for row in rows], next_cursor
+
+
+async def search_org_grants(db: AsyncSession, org_id: int, q: str, *, limit: int, offset: int, **filters):
+    criteria = _grant_filters(org_id, **filters)
+
+    if db.bind.dialect.name == "postgresql":
+        # Ranked match against the GIN-indexed, trigger-maintained column (see migrations 4 and 5)
+        search_vector = literal_column("grants.search_vector")
+        query = func.websearch_to_tsquery("english", q)
+        rank = func.ts_rank_cd(search_vector, query)
+        criteria.append(search_vector.op("@@")(query))
+    else:
+        pattern = f"%{q}%"
+        rank = literal(0.0)
+        criteria.append(or_(
+            models.Grant.title.ilike(pattern),
+            models.Grant.organizer.ilike(pattern),
+            models.Grant.description.ilike(pattern),
+            models.Grant.eligibility.ilike(pattern),
+        ))
+
+    result = await db.execute(
+        select(*SUMMARY_COLUMNS, rank.label("rank"))
+        .where(*criteria)
+        .order_by(rank.desc(), models.Grant.id.desc())
+        .offset(offset)
+        .limit(limit)
+    )
+    return [_grant_row_to_dict(row) for row in result.all()]
+
+
+def _export_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+async def _export_rows(sessionmaker, criteria: list, file_format: str):
+    # Runs after the request's dependencies have been torn down, so it owns its session.
+    # yield_per streams through a server-side cursor: memory stays flat regardless of row count.
+    columns = [column.key for column in EXPORT_COLUMNS]
+    async with sessionmaker() as db:
+        result = await db.stream(
+            select(*EXPORT_COLUMNS)
+            .where(*criteria)
+            .order_by(models.Grant.id)
+            .execution_options(yield_per=EXPORT_FETCH_SIZE)
+        )
+        if file_format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            async for rows in result.partitions():
+                writer.writerows([[_export_value(value) for value in row] for row in rows])
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue()
+        else:
+            async for rows in result.partitions():
+                yield "".join(
+                    json.dumps({key: _export_value(value) for key, value in zip(columns, row)}) + "\n"
+                    for row in rows
+                )
+
+
+def _import_format(upload: UploadFile, file_format: str | None) -> str:
+    if file_format:
+        return file_format
+    name = (upload.filename or "").lower()
+    if name.endswith((".ndjson", ".jsonl")) or "ndjson" in (upload.content_type or ""):
+        return "ndjson"
+    return "csv"
+
+
+def _iter_import_records(upload: UploadFile, file_format: str):
+    # Yields (line number, record, error) one row at a time from the spooled upload
+    stream = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+    try:
+        if file_format == "csv":
+            for line_no, record in enumerate(csv.DictReader(stream), start=2):
+                yield line_no, {k: (v.strip() or None) if isinstance(v, str) else v for k, v in record.items() if k}, None
+            return
+
+        for line_no, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_no, None, f"Invalid JSON: {e}"
+                continue
+            if not isinstance(record, dict):
+                yield line_no, None, "Expected a JSON object"
+                continue
+            yield line_no, record, None
+    finally:
+        stream.detach()
+
+
+def _next_import_chunk(records, org: OrgPrincipal, report: dict, seen: int) -> tuple[list, int, bool]:
+    # Returns up to IMPORT_BATCH_SIZE validated rows, the running row count, and whether input is done
+    batch = []
+    for line_no, record, error in records:
+        seen += 1
+        if seen > MAX_IMPORT_ROWS:
+            _import_error(report, line_no, f"Import limit of {MAX_IMPORT_ROWS} rows reached")
+            return batch, seen, True
+        if error:
+            _import_error(report, line_no, error)
+            continue
+        try:
+            item = GrantImportRow.model_validate(record)
+        except ValidationError as e:
+            _import_error(report, line_no, "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()))
+            continue
+
+        row = item.model_dump(include=set(IMPORT_FIELDS) | {"external_id"})
+        row.update(
+            organizer=item.organizer or org.name,
+            source="import",
+            is_verified=True,
+            is_active=True,
+            organization_id=org.id,
+            creator_id=org.user_id,
+            created_by_type="ORGANIZATION",
+            created_by_id=org.id,
+            status="LIVE",
+        )
+        batch.append((line_no, row))
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            return batch, seen, False
+    return batch, seen, True
+
+
+def _upsert_statement(dialect_name: str, rows: list, org_id: int):
+    if dialect_name == "postgresql":
+        insert = postgresql.insert
+    elif dialect_name == "sqlite":
+        insert = sqlite.insert
+    else:
+        raise HTTPException(status_code=501, detail="Bulk import is not supported on this database")
+
+    stmt = insert(models.Grant).values(rows)
+    # NULL external_ids never conflict, so rows without one are plain inserts in the same statement.
+    # The WHERE keeps an import from overwriting another organization's grant.
+    return stmt.on_conflict_do_update(
+        index_elements=[models.Grant.external_id],
+        set_={**{field: stmt.excluded[field] for field in IMPORT_FIELDS}, "updated_at": func.now()},
+        where=models.Grant.organization_id == org_id,
+    ).returning(models.Grant.external_id)
+
+
+async def _flush_import_batch(db: AsyncSession, batch: list, org_id: int, report: dict):
+    # Postgres rejects one statement touching the same conflict key twice, so the last row wins
+    by_external_id = {}
+    rows = []
+    for line_no, row in batch:
+        external_id = row["external_id"]
+        if external_id:
+            if external_id in by_external_id:
+                _import_error(report, by_external_id[external_id][0], "Superseded by a later row with the same external_id")
+            by_external_id[external_id] = (line_no, row)
+        else:
+            rows.append((line_no, row))
+    rows.extend(by_external_id.values())
+
+    try:
+        result = await db.execute(_upsert_statement(db.bind.dialect.name, [row for _, row in rows], org_id))
+        written = result.scalars().all()
+        await db.commit()
+    except DBAPIError as e:
+        # One bad row fails the whole statement; report the batch and carry on with the next one
+        await db.rollback()
+        logger.error(f"Grant import batch for org {org_id} failed: {str(e.orig)}")
+        for line_no, _ in rows:
+            _import_error(report, line_no, "Rejected by the database; batch not imported")
+        return
+
+    written_ids = {external_id for external_id in written if external_id}
+    report["imported"] += len(written)
+    for line_no, row in rows:
+        if row["external_id"] and row["external_id"] not in written_ids:
+            _import_error(report, line_no, "external_id belongs to another organization")
+
+
+def _import_error(report: dict, line_no: int, message: str):
+    report["failed"] += 1
+    if len(report["errors"]) < MAX_IMPORT_ERRORS:
+        report["errors"].append({"line": line_no, "error": message})
+
+
+async def _get_org_grant(db: AsyncSession, grant_id: int, org_id: int, *criteria):
+    result = await db.execute(
+        select(models.Grant).where(models.Grant.id == grant_id, models.Grant.organization_id == org_id, *criteria)
+    )
+    return result.scalar_one_or_none()
+
+
+async def grant_counters(db: AsyncSession, org_id: int):
+    # One conditional-aggregate scan instead of a COUNT(*) subquery per counter.
+    # The last-modified column doubles as the dashboard's ETag/Last-Modified validator.
+    result = await db.execute(
+        select(
+            func.count(models.Grant.id),
+            func.count(models.Grant.id).filter(models.Grant.is_active.is_(True)),
+            func.count(models.Grant.id).filter(models.Grant.status == "DELETION_PENDING"),
+            func.max(func.coalesce(models.Grant.updated_at, models.Grant.created_at)),
+        ).where(models.Grant.organization_id == org_id)
+    )
+    return result.one()
+
+
+def counters_payload(total_grants: int, active_grants: int, trash_count: int) -> dict:
+    # Trashed grants are excluded from the dashboard's totals
+    total_visible = total_grants - trash_count
+    return {
+        "total_grants": total_visible,
+        "active_grants": active_grants,
+        "inactive_grants": total_visible - active_grants,
+        "trash_count": trash_count,
+    }
+
+
+async def _publish(db: AsyncSession, org_id: int, event_type: str, ids: list, with_grants: bool = False):
+    # Called after commit; the stream carries the changed rows plus fresh counters so
+    # dashboards apply a delta instead of refetching everything
+    if not broker.active:
+        return
+    event = {"type": event_type, "ids": ids}
+    if with_grants and ids:
+        rows = await db.execute(
+            select(*FULL_COLUMNS).where(models.Grant.id.in_(ids), models.Grant.organization_id == org_id)
+        )
+        event["grants"] = [_grant_row_to_dict(row) for row in rows]
+    total_grants, active_grants, trash_count, _ = await grant_counters(db, org_id)
+    event["counters"] = counters_payload(total_grants, active_grants, trash_count)
+    await broker.publish(org_id, jsonable_encoder(event))
+
+
+def _sse(event_type: str, data) -> str:
+    return f"event: {event_type}\ndata: {orjson.dumps(data).decode()}\n\n"
+
+
+def _stream_expired(claims: tokens.TokenClaims) -> bool:
+    # Logged-out, password-changed or expired sessions get nothing more on an open stream
+    return tokens.revocations.is_revoked(claims) or bool(claims.expires_at and claims.expires_at <= time.time())
+
+
+async def _event_stream(request: Request, claims: tokens.TokenClaims):
+    queue = broker.subscribe(claims.org_id)
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=settings.SSE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected() or _stream_expired(claims):
+                    return
+                yield ": keepalive\n\n"
+                continue
+            if _stream_expired(claims):
+                return
+            yield _sse(event["type"], event)
+    finally:
+        broker.unsubscribe(claims.org_id, queue)
+
+
+@router.post("/events/ticket")
+async def grant_events_ticket(request: Request, org: OrgPrincipal = Depends(get_org_from_token)):
+    return {"ticket": tokens.issue_stream_ticket(request.state.claims), "expires_in": settings.SSE_TICKET_SECONDS}
+
+
+@router.get("/events")
+async def grant_events(request: Request, ticket: str = Query(...)):
+    # EventSource cannot send an Authorization header, so it opens the stream with a ticket from
+    # POST /events/ticket. No session dependency here: it would hold a pooled connection for the
+    # life of the stream.
+    try:
+        claims = tokens.decode_stream_ticket(ticket)
+    except tokens.InvalidToken:
+        raise HTTPException(status_code=401, detail="Invalid ticket")
+    if tokens.revocations.is_revoked(claims):
+        raise HTTPException(status_code=401, detail="Token revoked")
+    if not tokens.revocations.is_fresh(claims):
+        request.state.claims = claims
+        async with AsyncSessionLocal() as db:
+            await get_current_org_async(request, db)
+    return StreamingResponse(
+        _event_stream(request, claims),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("", response_model=GrantPage, response_model_exclude_unset=True)
+async def list_grants(
+    status: str | None = None,
+    trash: bool | None = None,
+    category: str | None = None,
+    refugee_country: str | None = None,
+    deadline_from: datetime | None = None,
+    deadline_to: datetime | None = None,
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    view: str = Query("summary", pattern="^(summary|full)$"),
+    db: AsyncSession = Depends(get_read_db),
+    org: OrgPrincipal = Depends(get_org_from_token)
+):
+    items, next_cursor = await list_org_grants(
+        db,
+        org.id,
+        status=status,
+        trash=trash,
+        category=category,
+        refugee_country=refugee_country,
+        deadline_from=deadline_from,
+        deadline_to=deadline_to,
+        cursor=cursor,
+        limit=limit,
+        full=view == "full",
+    )
+    return {"grants": items, "next_cursor": next_cursor}
+
+
+@router.get("/search")
+async def search_grants(
+    q: str = Query(..., min_length=1, max_length=200),
+    trash: bool | None = False,
+    category: str | None = None,
+    refugee_country: str | None = None,
+    deadline_from: datetime | None = None,
+    deadline_to: datetime | None = None,
+    limit: int = Query(20, ge=1, le=MAX_SEARCH_RESULTS),
+    offset: int = Query(0, ge=0, le=1000),
+    db: AsyncSession = Depends(get_read_db),
+    org: OrgPrincipal = Depends(get_org_from_token)
+):
+    results = await search_org_grants(
+        db,
+        org.id,
+        q,
+        limit=limit,
+        offset=offset,
+        trash=trash,
+        category=category,
+        refugee_country=refugee_country,
+        deadline_from=deadline_from,
+        deadline_to=deadline_to,
+    )
+    return {"grants": results, "query": q}
+
+
+@router.get("/export")
+async def export_grants(
+    file_format: str = Query("ndjson", alias="format", pattern="^(csv|ndjson)$"),
+    status: str | None = None,
+    active: bool | None = None,
+    trash: bool | None = None,
+    x_read_primary: str | None = Header(None),
+    org: OrgPrincipal = Depends(get_org_from_token)
+):
+    criteria = _grant_filters(org.id, status=status, active=active, trash=trash)
+    media_type = "text/csv" if file_format == "csv" else "application/x-ndjson"
+    sessionmaker = await read_sessionmaker(org.id, force_primary=x_read_primary == "1")
+    return StreamingResponse(
+        _export_rows(sessionmaker, criteria, file_format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="grants.{file_format}"'},
+    )
+
+
 @router.post("/create")
-def create_grant(
+async def create_grant(
     title: str = Form(...),
     organizer: str | None = Form(None),
     apply_url: str = Form(...),
@@ -28,8 +541,8 @@ def create_grant(
     refugee_country: str | None = Form(None),
     amount: str | None = Form(None),
     category: str | None = Form(None),
-    db: Session = Depends(get_db),
-    org: models.Organization = Depends(get_current_org)
+    db: AsyncSession = Depends(get_async_db),
+    org: OrgPrincipal = Depends(get_org_from_token)
 ):
     if org.status and org.status.lower() == "suspended":
         raise HTTPException(status_code=403, detail="Organization suspended")
@@ -54,13 +567,117 @@ def create_grant(
         status="LIVE"
     )
     db.add(grant)
-    db.commit()
+    await db.commit()
+    await pin_primary(org.id)
+    await _publish(db, org.id, "grant.created", [grant.id], with_grants=True)
 
     return {"message": "Grant created successfully", "id": grant.id}
 
 
+@router.post("/import")
+async def import_grants(
+    file: UploadFile = File(...),
+    file_format: str | None = Form(None, alias="format", pattern="^(csv|ndjson)$"),
+    db: AsyncSession = Depends(get_async_db),
+    org: OrgPrincipal = Depends(get_org_from_token)
+):
+    if org.status and org.status.lower() == "suspended":
+        raise HTTPException(status_code=403, detail="Organization suspended")
+
+    report = {"imported": 0, "failed": 0, "errors": []}
+    records = _iter_import_records(file, _import_format(file, file_format))
+    seen = 0
+    done = False
+    try:
+        while not done:
+            # Reading and validating rows is CPU-bound; keep it off the event loop, one chunk at a time
+            batch, seen, done = await run_in_threadpool(_next_import_chunk, records, org, report, seen)
+            if batch:
+                await _flush_import_batch(db, batch, org.id, report)
+    finally:
+        records.close()
+
+    report["errors"].sort(key=lambda err: err["line"])
+    await pin_primary(org.id)
+    if report["imported"]:
+        # Imports can touch thousands of rows; clients refetch rather than apply them one by one
+        await _publish(db, org.id, "grants.imported", [])
+    return report
+
+
+@router.post("/batch/trash")
+async def batch_trash(
+    body: GrantIdList,
+    db: AsyncSession = Depends(get_async_db),
+    org: OrgPrincipal = Depends(get_org_from_token)
+):
+    result = await db.execute(
+        update(models.Grant)
+        .where(
+            models.Grant.id.in_(body.ids),
+            models.Grant.organization_id == org.id,
+            or_(models.Grant.status != "DELETION_PENDING", models.Grant.status.is_(None)),
+        )
+        .values(status="DELETION_PENDING")
+        .returning(models.Grant.id)
+        .execution_options(synchronize_session=False)
+    )
+    ids = list(result.scalars())
+    await db.commit()
+    await pin_primary(org.id)
+    await _publish(db, org.id, "grant.trashed", ids)
+    return {"message": "Grants moved to pending deletion", "count": len(ids)}
+
+
+@router.post("/batch/restore")
+async def batch_restore(
+    body: GrantIdList,
+    db: AsyncSession = Depends(get_async_db),
+    org: OrgPrincipal = Depends(get_org_from_token)
+):
+    result = await db.execute(
+        update(models.Grant)
+        .where(
+            models.Grant.id.in_(body.ids),
+            models.Grant.organization_id == org.id,
+            models.Grant.status == "DELETION_PENDING",
+        )
+        .values(status="LIVE")
+        .returning(models.Grant.id)
+        .execution_options(synchronize_session=False)
+    )
+    ids = list(result.scalars())
+    await db.commit()
+    await pin_primary(org.id)
+    await _publish(db, org.id, "grant.restored", ids, with_grants=True)
+    return {"message": "Grants restored to workspace", "count": len(ids)}
+
+
+@router.post("/batch/purge")
+async def batch_purge(
+    body: GrantIdList,
+    db: AsyncSession = Depends(get_async_db),
+    org: OrgPrincipal = Depends(get_org_from_token)
+):
+    result = await db.execute(
+        delete(models.Grant)
+        .where(
+            models.Grant.id.in_(body.ids),
+            models.Grant.organization_id == org.id,
+            models.Grant.status == "DELETION_PENDING",
+        )
+        .returning(models.Grant.id)
+        .execution_options(synchronize_session=False)
+    )
+    ids = list(result.scalars())
+    await db.commit()
+    await pin_primary(org.id)
+    await _publish(db, org.id, "grant.purged", ids)
+    return {"message": "Grants permanently deleted", "count": len(ids)}
+
+
 @router.post("/{grant_id}/edit")
-def edit_grant(
+async def edit_grant(
     grant_id: int,
     title: str = Form(...),
     organizer: str | None = Form(None),
@@ -71,10 +688,10 @@ def edit_grant(
     refugee_country: str | None = Form(None),
     amount: str | None = Form(None),
     category: str | None = Form(None),
-    db: Session = Depends(get_db),
-    org: models.Organization = Depends(get_current_org)
+    db: AsyncSession = Depends(get_async_db),
+    org: OrgPrincipal = Depends(get_org_from_token)
 ):
-    grant = db.query(models.Grant).filter(models.Grant.id == grant_id, models.Grant.organization_id == org.id).first()
+    grant = await _get_org_grant(db, grant_id, org.id)
     if not grant:
         raise HTTPException(status_code=404, detail="Grant not found")
 
@@ -89,66 +706,65 @@ def edit_grant(
     grant.amount = amount
     grant.category = category
 
-    db.commit()
+    await db.commit()
+    await pin_primary(org.id)
+    await _publish(db, org.id, "grant.updated", [grant_id], with_grants=True)
 
     return {"message": "Grant updated successfully"}
 
 
 @router.post("/{grant_id}/delete")
-def delete_grant(
+async def delete_grant(
     grant_id: int,
-    db: Session = Depends(get_db),
-    org: models.Organization = Depends(get_current_org)
+    db: AsyncSession = Depends(get_async_db),
+    org: OrgPrincipal = Depends(get_org_from_token)
 ):
-    grant = db.query(models.Grant).filter(models.Grant.id == grant_id, models.Grant.organization_id == org.id).first()
+    grant = await _get_org_grant(db, grant_id, org.id)
     if not grant:
         raise HTTPException(status_code=404, detail="Grant not found")
 
     # Move to trash (Pending Deletion) instead of deleting
     grant.status = "DELETION_PENDING"
-    db.commit()
+    await db.commit()
+    await pin_primary(org.id)
+    await _publish(db, org.id, "grant.trashed", [grant_id])
 
     return {"message": "Grant moved to pending deletion"}
 
 
 @router.post("/{grant_id}/permanent-delete")
-def permanent_delete_grant(
+async def permanent_delete_grant(
     grant_id: int,
-    db: Session = Depends(get_db),
-    org: models.Organization = Depends(get_current_org)
+    db: AsyncSession = Depends(get_async_db),
+    org: OrgPrincipal = Depends(get_org_from_token)
 ):
-    grant = db.query(models.Grant).filter(
-        models.Grant.id == grant_id, 
-        models.Grant.organization_id == org.id,
-        models.Grant.status == "DELETION_PENDING"
-    ).first()
-    
+    grant = await _get_org_grant(db, grant_id, org.id, models.Grant.status == "DELETION_PENDING")
+
     if not grant:
         raise HTTPException(status_code=404, detail="Grant not found in pending deletion")
 
-    db.delete(grant)
-    db.commit()
+    await db.delete(grant)
+    await db.commit()
+    await pin_primary(org.id)
+    await _publish(db, org.id, "grant.purged", [grant_id])
 
     return {"message": "Grant permanently deleted"}
 
 
 @router.post("/{grant_id}/restore")
-def restore_grant(
+async def restore_grant(
     grant_id: int,
-    db: Session = Depends(get_db),
-    org: models.Organization = Depends(get_current_org)
+    db: AsyncSession = Depends(get_async_db),
+    org: OrgPrincipal = Depends(get_org_from_token)
 ):
-    grant = db.query(models.Grant).filter(
-        models.Grant.id == grant_id, 
-        models.Grant.organization_id == org.id,
-        models.Grant.status == "DELETION_PENDING"
-    ).first()
-    
+    grant = await _get_org_grant(db, grant_id, org.id, models.Grant.status == "DELETION_PENDING")
+
     if not grant:
         raise HTTPException(status_code=404, detail="Grant not found in pending deletion")
 
     grant.status = "LIVE"
-    db.commit()
+    await db.commit()
+    await pin_primary(org.id)
+    await _publish(db, org.id, "grant.restored", [grant_id], with_grants=True)
 
     return {"message": "Grant restored to workspace"}
-
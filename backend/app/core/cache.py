@@ -0,0 +1,164 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    # Small thread-safe LRU whose entries also expire after a fixed TTL.
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < now:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: float | None = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class LocalBackend:
+    # In-process stand-in for a shared cache, used in development and tests.
+    def __init__(self, maxsize: int = 10000):
+        self._cache = TTLCache(maxsize=maxsize, ttl=0)
+
+    def get(self, key: str, strict: bool = False):
+        return self._cache.get(key)
+
+    def set(self, key: str, value, ttl: float, strict: bool = False):
+        self._cache.set(key, value, ttl=ttl)
+
+    def delete(self, key: str):
+        self._cache.delete(key)
+
+
+class RedisBackend:
+    # Errors degrade to a miss or a skipped write: callers fall back to the local tier and the database.
+    # strict=True re-raises instead, for callers where a silent miss would be wrong.
+    def __init__(self, url: str):
+        import redis
+
+        self._errors = redis.RedisError
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+    def get(self, key: str, strict: bool = False):
+        try:
+            raw = self._client.get(key)
+        except self._errors as e:
+            if strict:
+                raise
+            logger.warning(f"Shared cache unavailable, reading {key} from the source: {str(e)}")
+            return None
+        return json.loads(raw) if raw else None
+
+    def set(self, key: str, value, ttl: float, strict: bool = False):
+        try:
+            self._client.set(key, json.dumps(value, default=str), ex=max(1, int(ttl)))
+        except self._errors as e:
+            if strict:
+                raise
+            logger.warning(f"Shared cache unavailable, {key} not stored: {str(e)}")
+
+    def delete(self, key: str):
+        try:
+            self._client.delete(key)
+        except self._errors as e:
+            # The entry expires on its own after ORG_CACHE_TTL_SECONDS
+            logger.warning(f"Shared cache unavailable, {key} not invalidated: {str(e)}")
+
+
+def build_shared_backend(url: str):
+    if not url:
+        return None
+    if url.startswith("memory://"):
+        return LocalBackend()
+    if url.startswith(("redis://", "rediss://")):
+        return RedisBackend(url)
+    raise ValueError(f"Unsupported CACHE_URL: {url}")
+
+
+class TieredCache:
+    # Per-worker TTL/LRU in front of an optional shared backend.
+    def __init__(self, prefix: str, maxsize: int, ttl: float, local_ttl: float, shared=None):
+        self.prefix = prefix
+        self.reset(maxsize, ttl, local_ttl, shared)
+
+    def reset(self, maxsize: int, ttl: float, local_ttl: float, shared=None):
+        self.ttl = ttl
+        self.shared = shared
+        self.local = TTLCache(maxsize=maxsize, ttl=local_ttl if shared else ttl)
+
+    def _key(self, key) -> str:
+        return f"{self.prefix}:{key}"
+
+    def get_local(self, key):
+        return self.local.get(key)
+
+    def get(self, key):
+        value = self.local.get(key)
+        if value is None and self.shared:
+            value = self.shared.get(self._key(key))
+            if value is not None:
+                self.local.set(key, value)
+        return value
+
+    def set(self, key, value):
+        self.local.set(key, value)
+        if self.shared:
+            self.shared.set(self._key(key), value, self.ttl)
+
+    def invalidate(self, key):
+        self.local.delete(key)
+        if self.shared:
+            self.shared.delete(self._key(key))
+
+
+shared_backend = build_shared_backend(settings.CACHE_URL)
+
+org_cache = TieredCache(
+    "org",
+    maxsize=settings.ORG_CACHE_MAX_SIZE,
+    ttl=settings.ORG_CACHE_TTL_SECONDS,
+    local_ttl=settings.ORG_CACHE_LOCAL_TTL_SECONDS,
+    shared=shared_backend,
+)
+
+
+def configure():
+    # Rebuild from settings after create_app() overrides; org_cache is imported by reference, so reset in place
+    global shared_backend
+    shared_backend = build_shared_backend(settings.CACHE_URL)
+    org_cache.reset(
+        settings.ORG_CACHE_MAX_SIZE, settings.ORG_CACHE_TTL_SECONDS, settings.ORG_CACHE_LOCAL_TTL_SECONDS,
+        shared_backend,
+    )
@@ -1,22 +1,29 @@
 import os
 from pathlib import Path
-from dotenv import load_dotenv
 
 # Load .env or .env.local from backend root
 base_dir = Path(__file__).resolve().parent.parent.parent
 local_env = base_dir / ".env.local"
 default_env = base_dir / ".env"
 
-# Always load .env first
-if default_env.exists():
-    load_dotenv(dotenv_path=default_env)
+# Deployments configure the environment directly; only import python-dotenv when a file exists
+if default_env.exists() or local_env.exists():
+    from dotenv import load_dotenv
+
+    # Always load .env first
+    if default_env.exists():
+        load_dotenv(dotenv_path=default_env)
+
+    # Then override with .env.local if it exists
+    if local_env.exists():
+        load_dotenv(dotenv_path=local_env, override=True)
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
 
-# Then override with .env.local if it exists
-if local_env.exists():
-    load_dotenv(dotenv_path=local_env, override=True)
-else:
-    # If no local env exists, ensure we have a fallback for DATABASE_URL if not set
-    pass
 
 class Settings:
     PROJECT_NAME: str = "Relivo Organization Portal"
@@ -25,10 +32,139 @@ class Settings:
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
 
+    # Connection pooling. "queue" keeps a pool of warm connections per worker;
+    # "null" opens a connection per checkout and is only meant for serverless deploys.
+    DB_POOL_MODE: str = os.getenv("DB_POOL_MODE", "queue").strip().lower()
+    # Per-worker connection budget: async pool (grant routes) + sync pool (auth routes, health) + each
+    # replica's async pool, i.e. by default (5 + 10) + (2 + 3) connections to the primary per worker.
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", 5))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", 10))
+    DB_SYNC_POOL_SIZE: int = int(os.getenv("DB_SYNC_POOL_SIZE", 2))
+    DB_SYNC_MAX_OVERFLOW: int = int(os.getenv("DB_SYNC_MAX_OVERFLOW", 3))
+    DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", 30))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", 1800))
+    DB_POOL_PRE_PING: bool = _env_bool("DB_POOL_PRE_PING", True)
+    DB_CONNECT_TIMEOUT: int = int(os.getenv("DB_CONNECT_TIMEOUT", 10))
+    # Set when DATABASE_URL points at PgBouncer in transaction pooling mode.
+    DB_PGBOUNCER: bool = _env_bool("DB_PGBOUNCER", False)
+
+    # Direct (non-PgBouncer) URL for migrations, which hold a session-level advisory lock
+    MIGRATION_DATABASE_URL: str = os.getenv("MIGRATION_DATABASE_URL", "").strip()
+
+    # Read replicas (comma-separated URLs) for read-only routes; see app/db/replicas.py
+    DATABASE_REPLICA_URLS: list = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+    REPLICA_MAX_LAG_SECONDS: float = float(os.getenv("REPLICA_MAX_LAG_SECONDS", 5))
+    REPLICA_LAG_CHECK_SECONDS: float = float(os.getenv("REPLICA_LAG_CHECK_SECONDS", 2))
+    # How long an org's reads stay on the primary after it writes
+    REPLICA_PIN_SECONDS: float = float(os.getenv("REPLICA_PIN_SECONDS", 10))
+    # Pins are shared through a redis CACHE_URL; only a single-process deployment may keep them per worker
+    REPLICA_LOCAL_PINS: bool = _env_bool("REPLICA_LOCAL_PINS", False)
+    # Disable when migrations run as a release step (python -m app.db.migrations)
+    MIGRATE_ON_STARTUP: bool = _env_bool("MIGRATE_ON_STARTUP", True)
+
+    # Shared cache backend ("redis://..." or "memory://" as a local stand-in); empty keeps caches per worker
+    CACHE_URL: str = os.getenv("CACHE_URL", "").strip()
+    ORG_CACHE_TTL_SECONDS: int = int(os.getenv("ORG_CACHE_TTL_SECONDS", 30))
+    ORG_CACHE_LOCAL_TTL_SECONDS: int = int(os.getenv("ORG_CACHE_LOCAL_TTL_SECONDS", 5))
+    ORG_CACHE_MAX_SIZE: int = int(os.getenv("ORG_CACHE_MAX_SIZE", 1024))
+
+    # Argon2 cost parameters; unset values keep passlib's defaults
+    ARGON2_TIME_COST: int | None = int(os.getenv("ARGON2_TIME_COST")) if os.getenv("ARGON2_TIME_COST") else None
+    ARGON2_MEMORY_COST: int | None = int(os.getenv("ARGON2_MEMORY_COST")) if os.getenv("ARGON2_MEMORY_COST") else None
+    ARGON2_PARALLELISM: int | None = int(os.getenv("ARGON2_PARALLELISM")) if os.getenv("ARGON2_PARALLELISM") else None
+    # Password hashing runs in a separate process pool; 0 workers hashes inline in the request thread
+    HASH_POOL_WORKERS: int = int(os.getenv("HASH_POOL_WORKERS", 2))
+    HASH_POOL_MAX_PENDING: int = int(os.getenv("HASH_POOL_MAX_PENDING", 8))
+    HASH_TIMEOUT_SECONDS: float = float(os.getenv("HASH_TIMEOUT_SECONDS", 10))
+
+    # /metrics is unauthenticated unless a token is set; it exposes no user data, only operational counters
+    METRICS_ENABLED: bool = _env_bool("METRICS_ENABLED", True)
+    METRICS_TOKEN: str = os.getenv("METRICS_TOKEN", "")
+
+    # Development/CI SQL profiling: Server-Timing header plus warnings for N+1 shapes and slow statements
+    SQL_PROFILING: bool = _env_bool("SQL_PROFILING", False)
+    SQL_SLOW_QUERY_MS: float = float(os.getenv("SQL_SLOW_QUERY_MS", 100))
+    SQL_REPEAT_THRESHOLD: int = int(os.getenv("SQL_REPEAT_THRESHOLD", 3))
+
+    # Decoded-token LRU and how often each worker picks up org token versions and revoked token ids
+    # changed since its last refresh; a full reload (which also drops deleted orgs) runs less often
+    TOKEN_CACHE_SIZE: int = int(os.getenv("TOKEN_CACHE_SIZE", 10000))
+    TOKEN_REFRESH_SECONDS: float = float(os.getenv("TOKEN_REFRESH_SECONDS", 5))
+    TOKEN_FULL_REFRESH_SECONDS: float = float(os.getenv("TOKEN_FULL_REFRESH_SECONDS", 300))
+
+    # Maintenance job (python -m app.workers.maintenance)
+    MAINTENANCE_TRASH_RETENTION_DAYS: int = int(os.getenv("MAINTENANCE_TRASH_RETENTION_DAYS", 30))
+    MAINTENANCE_EXPIRED_GRACE_DAYS: int = int(os.getenv("MAINTENANCE_EXPIRED_GRACE_DAYS", 1))
+    # Expired grants whose deadline is older than this move to grants_archive; 0 disables archiving
+    MAINTENANCE_ARCHIVE_AFTER_DAYS: int = int(os.getenv("MAINTENANCE_ARCHIVE_AFTER_DAYS", 180))
+    # expired/archive only touch org-owned grants unless this is on; the rest belong to other services
+    MAINTENANCE_INCLUDE_UNOWNED_GRANTS: bool = _env_bool("MAINTENANCE_INCLUDE_UNOWNED_GRANTS", False)
+    MAINTENANCE_OUTBOX_RETENTION_DAYS: int = int(os.getenv("MAINTENANCE_OUTBOX_RETENTION_DAYS", 14))
+    MAINTENANCE_BATCH_SIZE: int = int(os.getenv("MAINTENANCE_BATCH_SIZE", 1000))
+    MAINTENANCE_BATCH_PAUSE_SECONDS: float = float(os.getenv("MAINTENANCE_BATCH_PAUSE_SECONDS", 0.1))
+
+    # Dashboard grant events (server-sent). "postgres" fans events out to every worker via LISTEN/NOTIFY
+    EVENTS_BACKEND: str = os.getenv("EVENTS_BACKEND", "local").strip().lower()
+    # LISTEN needs a session-level connection, so this must bypass PgBouncer transaction pooling
+    EVENTS_DATABASE_URL: str = (
+        os.getenv("EVENTS_DATABASE_URL") or os.getenv("MIGRATION_DATABASE_URL") or os.getenv("DATABASE_URL") or ""
+    ).strip()
+    SSE_TICKET_SECONDS: int = int(os.getenv("SSE_TICKET_SECONDS", 60))
+    SSE_KEEPALIVE_SECONDS: float = float(os.getenv("SSE_KEEPALIVE_SECONDS", 15))
+    SSE_QUEUE_SIZE: int = int(os.getenv("SSE_QUEUE_SIZE", 100))
+
+    # Deadline reminder job (python -m app.workers.reminders); windows are days before the deadline
+    DEADLINE_REMINDER_WINDOWS: list = sorted({
+        int(days) for days in os.getenv("DEADLINE_REMINDER_WINDOWS", "7,1").split(",") if days.strip()
+    })
+    DEADLINE_REMINDER_CHUNK_SIZE: int = int(os.getenv("DEADLINE_REMINDER_CHUNK_SIZE", 500))
+    # Org digests per Brevo batch call; Brevo accepts up to 1000 messageVersions
+    DEADLINE_REMINDER_BATCH_SIZE: int = int(os.getenv("DEADLINE_REMINDER_BATCH_SIZE", 100))
+    DEADLINE_REMINDER_MAX_LISTED: int = int(os.getenv("DEADLINE_REMINDER_MAX_LISTED", 25))
+
+    # Auth throttling as "<requests>/<seconds>" token buckets, keyed by client IP and by email
+    RATE_LIMIT_ENABLED: bool = _env_bool("RATE_LIMIT_ENABLED", True)
+    RATE_LIMIT_URL: str = os.getenv("RATE_LIMIT_URL", os.getenv("CACHE_URL", "")).strip()
+    # Reverse proxies in front of the app that append to X-Forwarded-For (the hosting platform's router
+    # counts as one); 0 keys limits on the socket peer address
+    RATE_LIMIT_TRUSTED_PROXIES: int = int(os.getenv("RATE_LIMIT_TRUSTED_PROXIES", 1))
+    RATE_LIMIT_LOGIN_IP: str = os.getenv("RATE_LIMIT_LOGIN_IP", "30/60")
+    RATE_LIMIT_LOGIN_EMAIL: str = os.getenv("RATE_LIMIT_LOGIN_EMAIL", "10/60")
+    RATE_LIMIT_OTP_IP: str = os.getenv("RATE_LIMIT_OTP_IP", "30/60")
+    RATE_LIMIT_OTP_EMAIL: str = os.getenv("RATE_LIMIT_OTP_EMAIL", "10/60")
+    RATE_LIMIT_EMAIL_SEND_IP: str = os.getenv("RATE_LIMIT_EMAIL_SEND_IP", "10/60")
+    RATE_LIMIT_EMAIL_SEND_EMAIL: str = os.getenv("RATE_LIMIT_EMAIL_SEND_EMAIL", "3/300")
+    # Wrong codes allowed per OTP before it is invalidated and a new one must be requested
+    OTP_MAX_ATTEMPTS: int = int(os.getenv("OTP_MAX_ATTEMPTS", 5))
+
     MAIL_USERNAME: str = os.getenv("MAIL_USERNAME", "").strip()
     MAIL_PASSWORD: str = os.getenv("MAIL_PASSWORD", "").strip()
     MAIL_SERVER: str = os.getenv("MAIL_SERVER", "").strip()
     MAIL_PORT: int = int(os.getenv("MAIL_PORT", 2525))
     MAIL_FROM: str = os.getenv("MAIL_FROM", "").strip()
 
+    # Overridable so the dispatcher can be pointed at a local mock server
+    BREVO_API_URL: str = os.getenv("BREVO_API_URL", "https://api.brevo.com/v3/smtp/email").strip()
+    # Keep-alive connections to the Brevo API per process
+    EMAIL_CONCURRENCY: int = int(os.getenv("EMAIL_CONCURRENCY", 4))
+    EMAIL_MAX_RETRIES: int = int(os.getenv("EMAIL_MAX_RETRIES", 4))
+    EMAIL_RETRY_BACKOFF_SECONDS: float = float(os.getenv("EMAIL_RETRY_BACKOFF_SECONDS", 0.5))
+    # Drain the email outbox inside the web process; disable when running `python -m app.workers.outbox`
+    EMAIL_OUTBOX_INPROCESS: bool = _env_bool("EMAIL_OUTBOX_INPROCESS", True)
+    EMAIL_OUTBOX_BATCH_SIZE: int = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", 50))
+    EMAIL_OUTBOX_POLL_SECONDS: float = float(os.getenv("EMAIL_OUTBOX_POLL_SECONDS", 2))
+    EMAIL_OUTBOX_MAX_ATTEMPTS: int = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", 8))
+    # How long a claimed row stays "sending" before another worker may retry it
+    EMAIL_OUTBOX_LEASE_SECONDS: int = int(os.getenv("EMAIL_OUTBOX_LEASE_SECONDS", 300))
+
+    # Static frontend served at /; defaults to the repo's frontend/ directory
+    FRONTEND_DIR: str = os.getenv("FRONTEND_DIR", "").strip()
+
+    def configure(self, **overrides):
+        # Settings are read at call time, so overrides apply to anything not yet built
+        for name, value in overrides.items():
+            if not hasattr(type(self), name):
+                raise AttributeError(f"Unknown setting: {name}")
+            setattr(self, name, value)
+
 settings = Settings()
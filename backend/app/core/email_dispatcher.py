@@ -0,0 +1,110 @@
+import asyncio
+import logging
+import random
+import time
+from typing import TYPE_CHECKING
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.email_utils import brevo_headers
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+
+class EmailDeliveryError(Exception):
+    def __init__(self, message: str, retryable: bool, status: int | None = None, ambiguous: bool = False):
+        super().__init__(message)
+        self.retryable = retryable
+        self.status = status
+        # The request may have reached Brevo (e.g. a read timeout): resending could deliver twice
+        self.ambiguous = ambiguous
+
+
+class EmailDispatcher:
+    # Posts to the Brevo API over one keep-alive client, retrying transient failures with backoff.
+    # Durable queueing lives in the email outbox (app/workers/outbox.py), which calls post().
+
+    def __init__(
+        self,
+        api_url: str | None = None,
+        concurrency: int | None = None,
+        max_retries: int | None = None,
+        backoff: float | None = None,
+    ):
+        self.client = None
+        self.configure(api_url, concurrency, max_retries, backoff)
+
+    def configure(
+        self,
+        api_url: str | None = None,
+        concurrency: int | None = None,
+        max_retries: int | None = None,
+        backoff: float | None = None,
+    ):
+        # Options left as None follow settings; create_app() calls this again after applying overrides
+        self.api_url = api_url or settings.BREVO_API_URL
+        self.concurrency = concurrency or settings.EMAIL_CONCURRENCY
+        self.max_retries = settings.EMAIL_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff = settings.EMAIL_RETRY_BACKOFF_SECONDS if backoff is None else backoff
+
+    async def aclose(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    def _get_client(self) -> "httpx.AsyncClient":
+        # Created on the first send so workers that never email don't import httpx at boot
+        if self.client is None:
+            import httpx
+
+            self.client = httpx.AsyncClient(
+                headers=brevo_headers(),
+                timeout=10.0,
+                limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+            )
+        return self.client
+
+    async def post(self, payload: dict, url: str | None = None) -> "httpx.Response":
+        import httpx
+
+        client = self._get_client()
+        started = time.perf_counter()
+        try:
+            response = await client.post(url or self.api_url, json=payload)
+        except httpx.TransportError as e:
+            metrics.email_api_duration.observe(time.perf_counter() - started, ("transport_error",))
+            metrics.email_api_failures.inc(("true",))
+            unsent = isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
+            raise EmailDeliveryError(f"Brevo transport error: {e!r}", retryable=True, ambiguous=not unsent)
+        metrics.email_api_duration.observe(time.perf_counter() - started, (str(response.status_code),))
+        if response.status_code in (200, 201, 202):
+            return response
+        retryable = response.status_code in RETRYABLE_STATUS
+        metrics.email_api_failures.inc((str(retryable).lower(),))
+        raise EmailDeliveryError(
+            f"Brevo API error: {response.status_code} - {response.text}",
+            retryable=retryable,
+            status=response.status_code,
+        )
+
+    async def deliver(self, payload: dict, url: str | None = None, retry_ambiguous: bool = True) -> "httpx.Response":
+        # retry_ambiguous=False for sends that must not go out twice; the caller decides what to do instead
+        attempt = 0
+        while True:
+            try:
+                return await self.post(payload, url)
+            except EmailDeliveryError as e:
+                if not e.retryable or attempt >= self.max_retries or (e.ambiguous and not retry_ambiguous):
+                    raise
+                delay = self.backoff * (2 ** attempt) * (0.5 + random.random())
+                logger.warning(f"{e}; retrying in {delay:.2f}s")
+                attempt += 1
+                await asyncio.sleep(delay)
+
+
+email_dispatcher = EmailDispatcher()
@@ -1,17 +1,26 @@
 import logging
-import httpx
+from html import escape
+from sqlalchemy import update
+from sqlalchemy.orm import Session
 from app.core.config import settings
+from app.db import models
 
 logger = logging.getLogger(__name__)
 
-def send_otp_email(email: str, code: str) -> None:
-    url = "https://api.brevo.com/v3/smtp/email"
-    headers = {
+
+def brevo_headers() -> dict:
+    return {
         "accept": "application/json",
         "api-key": settings.MAIL_PASSWORD,
         "content-type": "application/json"
     }
-    
+
+
+def sender() -> dict:
+    return {"email": settings.MAIL_FROM, "name": "Relivo Org"}
+
+
+def otp_email_payload(email: str, code: str) -> dict:
     body_html = f'''
     <h3>Your Relivo verification code</h3>
     <p>Use the OTP below to verify your organization email:</p>
@@ -20,53 +29,114 @@ def send_otp_email(email: str, code: str) -> None:
     </div>
     <p>This code expires in 10 minutes.</p>
     '''
-    
-    payload = {
-        "sender": {"email": settings.MAIL_FROM, "name": "Relivo Org"},
+
+    return {
+        "sender": sender(),
         "to": [{"email": email}],
         "subject": "Relivo Organization Verification Code",
         "htmlContent": body_html
     }
 
+
+def password_changed_payload(email: str) -> dict:
+    body_html = '''
+    <h3>Your password has been updated</h3>
+    <p>If you did not change this password, contact support immediately.</p>
+    '''
+
+    return {
+        "sender": sender(),
+        "to": [{"email": email}],
+        "subject": "Relivo Password Updated",
+        "htmlContent": body_html
+    }
+
+
+def deadline_digest_version(email: str, org_name: str, grants: list, max_listed: int) -> dict:
+    # One messageVersions entry of a batch send; grants are (title, deadline) pairs, soonest first
+    items = "".join(
+        f"<li><b>{escape(title)}</b> closes on {deadline:%d %b %Y, %H:%M} UTC</li>"
+        for title, deadline in grants[:max_listed]
+    )
+    more = len(grants) - max_listed
+    if more > 0:
+        items += f"<li>and {more} more</li>"
+    body_html = f'''
+    <h3>Grants closing soon</h3>
+    <p>These grants published by {escape(org_name)} on Relivo are reaching their deadline:</p>
+    <ul>{items}</ul>
+    <p>Update or extend them from your dashboard if they are still open.</p>
+    '''
+
+    count = len(grants)
+    return {
+        "to": [{"email": email, "name": org_name}],
+        "subject": f"Relivo: {count} grant{'s' if count != 1 else ''} closing soon",
+        "htmlContent": body_html
+    }
+
+
+def batch_email_payload(versions: list) -> dict:
+    # Brevo batch send: the top-level subject/htmlContent are required defaults, each version overrides them
+    return {
+        "sender": sender(),
+        "subject": versions[0]["subject"],
+        "htmlContent": versions[0]["htmlContent"],
+        "messageVersions": versions
+    }
+
+
+def queue_email(db: Session, kind: str, recipient: str, payload: dict, dedup_key: str | None = None) -> None:
+    # Written in the caller's transaction; the outbox worker sends it after commit
+    if dedup_key:
+        result = db.execute(
+            update(models.EmailOutbox)
+            .where(models.EmailOutbox.dedup_key == dedup_key, models.EmailOutbox.status == "pending")
+            .values(payload=payload, attempts=0, last_error=None)
+        )
+        if result.rowcount:
+            return
+    db.add(models.EmailOutbox(kind=kind, recipient=recipient, payload=payload, dedup_key=dedup_key))
+
+
+def queue_otp_email(db: Session, email: str, code: str) -> None:
+    # A resend replaces the code in any OTP email that has not gone out yet
+    queue_email(db, "otp", email, otp_email_payload(email, code), dedup_key=f"otp:{email}")
+
+
+def queue_password_changed_email(db: Session, email: str) -> None:
+    queue_email(db, "password_changed", email, password_changed_payload(email))
+
+
+def send_otp_email(email: str, code: str) -> None:
+    import httpx
+
+    payload = otp_email_payload(email, code)
+
     try:
         logger.info(f"Sending OTP email via Brevo API to {email}...")
-        response = httpx.post(url, headers=headers, json=payload, timeout=10.0)
-        
+        response = httpx.post(settings.BREVO_API_URL, headers=brevo_headers(), json=payload, timeout=10.0)
+
         if response.status_code in (201, 202, 200):
             logger.info(f"OTP email sent successfully via API to {email}")
         else:
             logger.error(f"Brevo API error: {response.status_code} - {response.text}")
             raise Exception(f"Brevo API failed with status {response.status_code}")
-            
+
     except Exception as e:
         logger.error(f"Failed to send OTP email to {email} via API: {str(e)}")
         raise e
 
 
 def send_password_changed_email(email: str) -> None:
-    url = "https://api.brevo.com/v3/smtp/email"
-    headers = {
-        "accept": "application/json",
-        "api-key": settings.MAIL_PASSWORD,
-        "content-type": "application/json"
-    }
+    import httpx
 
-    body_html = '''
-    <h3>Your password has been updated</h3>
-    <p>If you did not change this password, contact support immediately.</p>
-    '''
-
-    payload = {
-        "sender": {"email": settings.MAIL_FROM, "name": "Relivo Org"},
-        "to": [{"email": email}],
-        "subject": "Relivo Password Updated",
-        "htmlContent": body_html
-    }
+    payload = password_changed_payload(email)
 
     try:
         logger.info(f"Sending password change email via Brevo API to {email}...")
-        response = httpx.post(url, headers=headers, json=payload, timeout=10.0)
-        
+        response = httpx.post(settings.BREVO_API_URL, headers=brevo_headers(), json=payload, timeout=10.0)
+
         if response.status_code in (201, 202, 200):
             logger.info(f"Password update email sent successfully via API to {email}")
         else:
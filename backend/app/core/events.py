@@ -0,0 +1,163 @@
+"""Per-org grant change events for the dashboard's server-sent event stream.
+
+Handlers publish after committing. Subscribers on this worker get the event straight away. With
+EVENTS_BACKEND=postgres the event also goes out over NOTIFY on a dedicated connection, so streams
+held open by other workers receive it. The connection must be direct (not PgBouncer in
+transaction mode), hence EVENTS_DATABASE_URL.
+"""
+import asyncio
+import logging
+import uuid
+
+import orjson
+from sqlalchemy.engine import make_url
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "grant_events"
+# NOTIFY payloads are capped at 8000 bytes
+MAX_NOTIFY_BYTES = 7900
+
+
+class PostgresNotifyBackend:
+    def __init__(self, url: str):
+        url = make_url(url).set(drivername="postgresql")
+        self.dsn = url.render_as_string(hide_password=False)
+        self._conn = None
+        self._lock = asyncio.Lock()
+        self._task = None
+        self._on_message = None
+
+    async def start(self, on_message):
+        self._on_message = on_message
+        self._task = asyncio.create_task(self._listen_forever())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        if self._conn is not None and not self._conn.is_closed():
+            await self._conn.close()
+        self._conn = None
+
+    def _notification(self, conn, pid, channel, payload):
+        self._on_message(payload)
+
+    async def _listen_forever(self):
+        import asyncpg
+
+        delay = 1.0
+        while True:
+            try:
+                self._conn = await asyncpg.connect(self.dsn)
+                closed = asyncio.Event()
+                self._conn.add_termination_listener(lambda conn: closed.set())
+                await self._conn.add_listener(CHANNEL, self._notification)
+                delay = 1.0
+                await closed.wait()
+                logger.warning("Event listener connection closed; reconnecting")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Event listener failed: {str(e)}; retrying in {delay:.0f}s")
+            self._conn = None
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
+
+    async def publish(self, payload: str):
+        if self._conn is None:
+            logger.warning("Event listener not connected; event delivered to this worker only")
+            return
+        async with self._lock:
+            await self._conn.execute("SELECT pg_notify($1, $2)", CHANNEL, payload)
+
+
+class EventBroker:
+    def __init__(self, backend=None, queue_size: int | None = None):
+        self.backend = backend
+        self.queue_size = queue_size or settings.SSE_QUEUE_SIZE
+        # Lets each worker skip its own notifications, which it already delivered locally
+        self.origin = uuid.uuid4().hex
+        self._subscribers = {}
+
+    @property
+    def active(self) -> bool:
+        # Skip building events (and the counter query) when nobody can receive them
+        return bool(self._subscribers) or self.backend is not None
+
+    async def start(self):
+        if self.backend is not None:
+            await self.backend.start(self._on_backend_message)
+
+    async def stop(self):
+        if self.backend is not None:
+            await self.backend.stop()
+
+    def subscribe(self, org_id: int) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(org_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, org_id: int, queue: asyncio.Queue):
+        queues = self._subscribers.get(org_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[org_id]
+
+    def _deliver(self, org_id: int, event: dict):
+        for queue in self._subscribers.get(org_id, ()):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # A stalled client lost events; tell it to reload instead of applying partial deltas
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({"type": "resync"})
+
+    def _on_backend_message(self, payload: str):
+        try:
+            message = orjson.loads(payload)
+        except orjson.JSONDecodeError:
+            return
+        if message.get("origin") != self.origin:
+            self._deliver(message["org_id"], message["event"])
+
+    async def publish(self, org_id: int, event: dict):
+        self._deliver(org_id, event)
+        if self.backend is None:
+            return
+        message = {"origin": self.origin, "org_id": org_id, "event": event}
+        payload = orjson.dumps(message)
+        if len(payload) > MAX_NOTIFY_BYTES:
+            # Too large to NOTIFY: other workers get ids and counters only and refetch the grants
+            message["event"] = {key: value for key, value in event.items() if key != "grants"}
+            payload = orjson.dumps(message)
+        if len(payload) > MAX_NOTIFY_BYTES:
+            # Still too large (thousands of ids): their clients reload instead
+            message["event"] = {"type": "resync"}
+            payload = orjson.dumps(message)
+        try:
+            await self.backend.publish(payload.decode())
+        except Exception as e:
+            logger.error(f"Failed to publish grant event: {str(e)}")
+
+
+def build_backend(name: str):
+    if name == "local":
+        return None
+    if name == "postgres":
+        return PostgresNotifyBackend(settings.EVENTS_DATABASE_URL)
+    raise ValueError(f"Unknown EVENTS_BACKEND: {name}")
+
+
+broker = EventBroker(build_backend(settings.EVENTS_BACKEND))
+
+
+def configure():
+    # Rebuild from settings after create_app() overrides; broker is imported by reference
+    broker.backend = build_backend(settings.EVENTS_BACKEND)
+    broker.queue_size = settings.SSE_QUEUE_SIZE
@@ -0,0 +1,107 @@
+import gzip
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+import orjson
+
+try:
+    import brotli
+except ImportError:  # optional: fall back to gzip only
+    brotli = None
+
+# Bodies smaller than this are not worth the compression CPU
+MIN_COMPRESS_SIZE = 1024
+
+
+def make_etag(*parts) -> str:
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()[:32]
+    # Weak: the same entity is served with different Content-Encodings
+    return f'W/"{digest}"'
+
+
+def _as_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+
+def _cache_headers(etag: str, last_modified: datetime | None) -> dict:
+    headers = {
+        "ETag": etag,
+        # Revalidate every time; the browser then sends If-None-Match on its own
+        "Cache-Control": "private, no-cache",
+        "Vary": "Accept-Encoding, Authorization",
+    }
+    if last_modified:
+        headers["Last-Modified"] = format_datetime(_as_utc(last_modified).replace(microsecond=0), usegmt=True)
+    return headers
+
+
+def not_modified(request: Request, etag: str, last_modified: datetime | None = None) -> Response | None:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        matched = _etag_matches(if_none_match, etag)
+    elif last_modified and request.headers.get("if-modified-since"):
+        try:
+            since = parsedate_to_datetime(request.headers["if-modified-since"])
+        except (TypeError, ValueError):
+            return None
+        matched = _as_utc(last_modified).replace(microsecond=0) <= _as_utc(since)
+    else:
+        return None
+    if matched:
+        return Response(status_code=304, headers=_cache_headers(etag, last_modified))
+    return None
+
+
+def negotiate_encoding(accept_encoding: str) -> str | None:
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+def render_json(content) -> bytes:
+    if isinstance(content, BaseModel):
+        # Serialized by pydantic-core directly, without an intermediate dict
+        return content.model_dump_json().encode()
+    return orjson.dumps(content, default=jsonable_encoder)
+
+
+def cached_json_response(request: Request, content, etag: str, last_modified: datetime | None = None) -> Response:
+    body = render_json(content)
+    headers = _cache_headers(etag, last_modified)
+    if len(body) >= MIN_COMPRESS_SIZE:
+        encoding = negotiate_encoding(request.headers.get("accept-encoding", ""))
+        if encoding:
+            body = compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
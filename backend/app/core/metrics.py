@@ -0,0 +1,255 @@
+"""Process-local metrics rendered in the Prometheus text exposition format.
+
+Each worker keeps its own registry, so scrape every worker (or label targets per worker) and let
+Prometheus aggregate. Recording a sample is a dict lookup and an add under a lock.
+"""
+import bisect
+import contextvars
+import threading
+import time
+
+from sqlalchemy import event
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+COUNT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), collect=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        # Optional callable returning {labels: value}, evaluated at scrape time
+        self._collect = collect
+
+    def _header(self) -> list:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+
+    def render(self) -> list:
+        if self._collect is not None:
+            values = self._collect()
+            with self._lock:
+                self._values = dict(values)
+        with self._lock:
+            items = sorted(self._values.items())
+        lines = self._header()
+        for labels, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def set(self, value: float, labels: tuple = ()):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, labels: tuple = ()):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                # Per-bucket (non-cumulative) counts, then sum and count
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def time(self, labels: tuple = ()):
+        return _Timer(self, labels)
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted((labels, ([*state[0]], state[1], state[2])) for labels, state in self._values.items())
+        lines = self._header()
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_text} {count}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram: Histogram, labels: tuple):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, self.labels)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+http_request_duration = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route", "status"),
+))
+http_request_queries = REGISTRY.register(Histogram(
+    "http_request_db_queries", "Database statements executed per HTTP request.", ("route",), COUNT_BUCKETS,
+))
+db_query_duration = REGISTRY.register(Histogram(
+    "db_query_duration_seconds", "Database statement execution time.", ("engine",), QUERY_BUCKETS,
+))
+db_query_errors = REGISTRY.register(Counter(
+    "db_query_errors_total", "Database statements that raised.", ("engine",),
+))
+password_hash_duration = REGISTRY.register(Histogram(
+    "password_hash_duration_seconds", "Argon2 hash/verify time including pool wait.", ("operation",),
+))
+password_hash_rejected = REGISTRY.register(Counter(
+    "password_hash_rejected_total", "Hash jobs refused because the hashing pool was saturated.",
+))
+email_api_duration = REGISTRY.register(Histogram(
+    "email_api_request_duration_seconds", "Brevo API request latency.", ("outcome",),
+))
+email_api_failures = REGISTRY.register(Counter(
+    "email_api_failures_total", "Failed Brevo API requests.", ("retryable",),
+))
+email_outbox_pending = REGISTRY.register(Gauge(
+    "email_outbox_pending", "Outbox rows waiting to be sent.",
+))
+
+
+class QueryUsage:
+    __slots__ = ("count", "seconds")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+# Set by MetricsMiddleware; sync routes see it too because the threadpool copies the context
+current_usage: contextvars.ContextVar = contextvars.ContextVar("query_usage", default=None)
+
+
+def instrument_engine(target_engine, label: str):
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        db_query_duration.observe(elapsed, (label,))
+        usage = current_usage.get()
+        if usage is not None:
+            usage.count += 1
+            usage.seconds += elapsed
+
+    def handle_error(exception_context):
+        started = exception_context.connection.info.get("query_started") if exception_context.connection else None
+        if started:
+            started.pop()
+        db_query_errors.inc((label,))
+
+    event.listen(target_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(target_engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(target_engine, "handle_error", handle_error)
+
+
+class MetricsMiddleware:
+    # Pure ASGI so streaming responses are timed to the last byte without buffering
+    def __init__(self, app):
+        self.app = app
+        self._route_labels = None
+
+    def _route_label(self, scope) -> str:
+        if self._route_labels is None:
+            labels = {}
+            for route in scope["app"].routes:
+                if hasattr(route, "endpoint"):
+                    labels[route.endpoint] = route.path
+                else:
+                    # Mounted apps (the frontend) get one label for everything beneath them
+                    labels[getattr(route, "app", None)] = f"{route.path}/*"
+            self._route_labels = labels
+        # Starlette's router records the matched endpoint in the (shared) scope
+        return self._route_labels.get(scope.get("endpoint"), "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+        usage = QueryUsage()
+        token = current_usage.set(usage)
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            current_usage.reset(token)
+            route = self._route_label(scope)
+            http_request_duration.observe(time.perf_counter() - started, (scope["method"], route, str(status)))
+            http_request_queries.observe(usage.count, (route,))
@@ -0,0 +1,156 @@
+"""Per-request SQL profiling for development and CI.
+
+With SQL_PROFILING on, QueryProfilerMiddleware records every statement a request executes, logs
+statement shapes repeated SQL_REPEAT_THRESHOLD or more times (usually an N+1 loop) and statements
+slower than SQL_SLOW_QUERY_MS, and reports the totals in a Server-Timing header.
+
+query_budget() works without the middleware and catches queries from any thread, so tests can pin
+an endpoint's query count:
+
+    with query_budget(3):
+        client.get("/api/dashboard_data", headers=auth)
+"""
+import contextvars
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_IN_LIST = re.compile(r"\((?:\s*(?:\?|%\(\w+\)s|\$\d+|:\w+)\s*,)+\s*(?:\?|%\(\w+\)s|\$\d+|:\w+)\s*\)")
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    shape = _IN_LIST.sub("(?, ...)", statement)
+    shape = _LITERAL.sub("?", shape)
+    return _SPACE.sub(" ", shape).strip()
+
+
+class QueryProfile:
+    def __init__(self):
+        self.statements = []
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, seconds: float):
+        with self._lock:
+            self.statements.append((statement, seconds))
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    @property
+    def seconds(self) -> float:
+        return sum(seconds for _, seconds in self.statements)
+
+    def repeated(self, threshold: int) -> list:
+        shapes = Counter(statement_shape(statement) for statement, _ in self.statements)
+        return [(shape, count) for shape, count in shapes.most_common() if count >= threshold]
+
+    def slow(self, threshold_seconds: float) -> list:
+        return [(statement, seconds) for statement, seconds in self.statements if seconds >= threshold_seconds]
+
+
+_current_profile: contextvars.ContextVar = contextvars.ContextVar("query_profile", default=None)
+# Budgets are process-wide: TestClient runs the app on another thread, outside the test's context
+_active_budgets = []
+
+
+def instrument_engine(target_engine):
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _active_budgets or _current_profile.get() is not None:
+            conn.info.setdefault("profile_started", []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get("profile_started")
+        if not started:
+            return
+        elapsed = time.perf_counter() - started.pop()
+        profile = _current_profile.get()
+        if profile is not None:
+            profile.record(statement, elapsed)
+        for budget in list(_active_budgets):
+            budget.record(statement, elapsed)
+
+    def handle_error(exception_context):
+        started = exception_context.connection.info.get("profile_started") if exception_context.connection else None
+        if started:
+            started.pop()
+
+    event.listen(target_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(target_engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(target_engine, "handle_error", handle_error)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@contextmanager
+def query_budget(max_queries: int, max_repeats: int | None = None):
+    profile = QueryProfile()
+    _active_budgets.append(profile)
+    try:
+        yield profile
+    finally:
+        _active_budgets.remove(profile)
+
+    if profile.count > max_queries:
+        listing = "\n".join(f"  {statement_shape(statement)}" for statement, _ in profile.statements)
+        raise QueryBudgetExceeded(f"{profile.count} queries executed, budget is {max_queries}:\n{listing}")
+    if max_repeats is not None:
+        repeated = profile.repeated(max_repeats + 1)
+        if repeated:
+            shape, count = repeated[0]
+            raise QueryBudgetExceeded(f"Statement repeated {count} times (max {max_repeats}): {shape}")
+
+
+def _server_timing(profile: QueryProfile, total_seconds: float) -> str:
+    return (
+        f'db;dur={profile.seconds * 1000:.2f};desc="{profile.count} queries", '
+        f"total;dur={total_seconds * 1000:.2f}"
+    )
+
+
+class QueryProfilerMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        profile = QueryProfile()
+        token = _current_profile.set(profile)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                # Statements executed while a streaming body is produced are logged but not in the header
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", _server_timing(profile, time.perf_counter() - started).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_profile.reset(token)
+            self._report(scope, profile)
+
+    def _report(self, scope, profile: QueryProfile):
+        where = f"{scope['method']} {scope['path']}"
+        for shape, count in profile.repeated(settings.SQL_REPEAT_THRESHOLD):
+            logger.warning(f"{where}: statement repeated {count} times (possible N+1): {shape}")
+        for statement, seconds in profile.slow(settings.SQL_SLOW_QUERY_MS / 1000):
+            logger.warning(f"{where}: slow statement ({seconds * 1000:.1f} ms): {statement_shape(statement)}")
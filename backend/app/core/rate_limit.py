@@ -0,0 +1,137 @@
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi import Request
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__("Too many requests")
+        self.retry_after = retry_after
+
+
+class LocalBackend:
+    # Per-process token buckets, bounded so a flood of distinct keys cannot grow memory without limit.
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: int, period: float) -> float:
+        rate = capacity / period
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                tokens -= 1
+                retry_after = 0.0
+            else:
+                retry_after = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return retry_after
+
+
+_REDIS_TOKEN_BUCKET = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + (now - ts) * rate)
+local retry_after = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+else
+  retry_after = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(retry_after)
+"""
+
+
+class RedisBackend:
+    # Shares buckets across workers; the bucket update runs atomically as a Lua script.
+    def __init__(self, url: str):
+        import redis
+
+        self._errors = redis.RedisError
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self._script = self._client.register_script(_REDIS_TOKEN_BUCKET)
+
+    def take(self, key: str, capacity: int, period: float) -> float:
+        try:
+            return float(self._script(keys=[f"ratelimit:{key}"], args=[capacity, capacity / period]))
+        except self._errors as e:
+            # Fail open: an unreachable limiter must not take login and OTP down with it
+            logger.warning(f"Rate limit backend unavailable, allowing request: {str(e)}")
+            return 0.0
+
+
+def build_backend(url: str):
+    if not url or url.startswith("memory://"):
+        return LocalBackend()
+    if url.startswith(("redis://", "rediss://")):
+        return RedisBackend(url)
+    raise ValueError(f"Unsupported RATE_LIMIT_URL: {url}")
+
+
+def parse_rule(spec: str) -> tuple[int, float]:
+    # "<count>/<seconds>", e.g. "10/60"
+    count, _, seconds = spec.partition("/")
+    return int(count), float(seconds or 60)
+
+
+def build_rules() -> dict:
+    return {
+        "login": (parse_rule(settings.RATE_LIMIT_LOGIN_IP), parse_rule(settings.RATE_LIMIT_LOGIN_EMAIL)),
+        "otp": (parse_rule(settings.RATE_LIMIT_OTP_IP), parse_rule(settings.RATE_LIMIT_OTP_EMAIL)),
+        "email_send": (parse_rule(settings.RATE_LIMIT_EMAIL_SEND_IP), parse_rule(settings.RATE_LIMIT_EMAIL_SEND_EMAIL)),
+    }
+
+
+RULES = build_rules()
+backend = build_backend(settings.RATE_LIMIT_URL)
+
+
+def configure():
+    # Rebuild from settings after create_app() overrides
+    global RULES, backend
+    RULES = build_rules()
+    backend = build_backend(settings.RATE_LIMIT_URL)
+
+
+def client_ip(request: Request) -> str:
+    # Each trusted proxy appends the address it saw, so the client is the Nth entry from the right;
+    # anything further left is whatever the client chose to send
+    hops = settings.RATE_LIMIT_TRUSTED_PROXIES
+    if hops > 0:
+        forwarded = [part.strip() for part in request.headers.get("x-forwarded-for", "").split(",") if part.strip()]
+        if forwarded:
+            return forwarded[-min(hops, len(forwarded))]
+    return request.client.host if request.client else "unknown"
+
+
+def enforce(rule: str, request: Request, email: str | None = None):
+    # Call before any Argon2 work or outbound email so floods are rejected cheaply
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+    (ip_count, ip_period), (email_count, email_period) = RULES[rule]
+    retry_after = backend.take(f"{rule}:ip:{client_ip(request)}", ip_count, ip_period)
+    if email and not retry_after:
+        retry_after = backend.take(f"{rule}:email:{email}", email_count, email_period)
+    if retry_after:
+        raise RateLimited(math.ceil(retry_after))
@@ -1,13 +1,144 @@
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timedelta
 from typing import Optional, Union, Any
-from jose import jwt
-from passlib.context import CryptContext
+from app.core import metrics
 from app.core.config import settings
 
-# Sync with admin backend schemes
-pwd_context = CryptContext(schemes=["argon2", "bcrypt"], deprecated="auto")
+logger = logging.getLogger(__name__)
 
-def create_access_token(subject: Union[str, Any], org_id: int, role: str, expires_delta: Optional[timedelta] = None) -> str:
+
+class HashingBusy(Exception):
+    pass
+
+
+def _argon2_options() -> dict:
+    options = {}
+    if settings.ARGON2_TIME_COST:
+        options["argon2__time_cost"] = settings.ARGON2_TIME_COST
+    if settings.ARGON2_MEMORY_COST:
+        options["argon2__memory_cost"] = settings.ARGON2_MEMORY_COST
+    if settings.ARGON2_PARALLELISM:
+        options["argon2__parallelism"] = settings.ARGON2_PARALLELISM
+    return options
+
+
+_pwd_context = None
+
+
+def _build_pwd_context(options: dict):
+    from passlib.context import CryptContext
+
+    # Sync with admin backend schemes
+    return CryptContext(schemes=["argon2", "bcrypt"], deprecated="auto", **options)
+
+
+def get_pwd_context():
+    # Built on first use: passlib and argon2 stay out of worker boot and of requests that never hash
+    global _pwd_context
+    if _pwd_context is None:
+        _pwd_context = _build_pwd_context(_argon2_options())
+    return _pwd_context
+
+
+def _init_hashing_process(options: dict):
+    # Spawned processes re-read settings from the environment, so the parent passes its Argon2 options
+    global _pwd_context
+    _pwd_context = _build_pwd_context(options)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+# Caps queued + running hash jobs so a burst fails fast instead of piling up behind the pool
+_slots = threading.BoundedSemaphore(max(1, settings.HASH_POOL_MAX_PENDING))
+
+
+def configure():
+    # Rebuild from settings after create_app() overrides; the pool itself is created on first use
+    global _slots, _pwd_context
+    shutdown_hashing()
+    _pwd_context = None
+    _slots = threading.BoundedSemaphore(max(1, settings.HASH_POOL_MAX_PENDING))
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                # spawn: forking a threaded web worker can deadlock the child
+                _executor = ProcessPoolExecutor(
+                    max_workers=settings.HASH_POOL_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_hashing_process,
+                    initargs=(_argon2_options(),),
+                )
+    return _executor
+
+
+def shutdown_hashing():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _reset_broken_executor(broken: ProcessPoolExecutor):
+    # A crashed hashing process breaks the whole pool; the next call builds a fresh one
+    global _executor
+    with _executor_lock:
+        if _executor is broken:
+            _executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def _run_hashing(fn, *args):
+    if settings.HASH_POOL_WORKERS <= 0:
+        return fn(*args)
+    if not _slots.acquire(blocking=False):
+        metrics.password_hash_rejected.inc()
+        raise HashingBusy()
+    executor = _get_executor()
+    try:
+        future = executor.submit(fn, *args)
+    except BrokenProcessPool:
+        _slots.release()
+        _reset_broken_executor(executor)
+        raise HashingBusy()
+    except Exception:
+        _slots.release()
+        raise
+    # The slot is held until the job actually finishes, even if the caller stops waiting
+    future.add_done_callback(lambda _: _slots.release())
+    try:
+        return future.result(timeout=settings.HASH_TIMEOUT_SECONDS)
+    except FutureTimeout:
+        metrics.password_hash_rejected.inc()
+        raise HashingBusy()
+    except BrokenProcessPool:
+        logger.error("Password hashing pool broke; restarting it")
+        _reset_broken_executor(executor)
+        raise HashingBusy()
+
+
+def _hash(password: str) -> str:
+    return get_pwd_context().hash(password)
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return get_pwd_context().verify(plain_password, hashed_password)
+
+
+def create_access_token(
+    subject: Union[str, Any],
+    org_id: int,
+    role: str,
+    expires_delta: Optional[timedelta] = None,
+    extra_claims: Optional[dict] = None,
+) -> str:
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
@@ -19,13 +150,19 @@ def create_access_token(subject: Union[str, Any], org_id: int, role: str, expire
         "role": role,
         "exp": expire,
     }
+    if extra_claims:
+        to_encode.update(extra_claims)
+    from jose import jwt
+
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    with metrics.password_hash_duration.time(("verify",)):
+        return _run_hashing(_verify, plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    with metrics.password_hash_duration.time(("hash",)):
+        return _run_hashing(_hash, password)
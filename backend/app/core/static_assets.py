@@ -0,0 +1,160 @@
+"""In-memory static asset server for the frontend.
+
+At startup every file under the frontend directory is read once, fingerprinted and (for text
+types) precompressed with gzip and, when available, brotli. HTML and CSS references to local
+assets are rewritten to the fingerprinted names, which are served with an immutable
+Cache-Control. Requests never touch the filesystem.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+
+from app.core.http_cache import brotli, negotiate_encoding
+
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+_HTML_REF = re.compile(r'(\b(?:src|href)=")([^"#?:]+)(")')
+_CSS_REF = re.compile(r"""(url\(\s*['"]?)([^'")#?:]+)(['"]?\s*\))""")
+
+
+class Asset:
+    __slots__ = ("body", "gzip", "br", "etag", "media_type", "cache_control")
+
+    def __init__(self, body: bytes, media_type: str, cache_control: str):
+        self.body = body
+        self.media_type = media_type
+        self.cache_control = cache_control
+        self.etag = f'W/"{hashlib.sha256(body).hexdigest()[:32]}"'
+        self.gzip = None
+        self.br = None
+        if media_type.startswith(COMPRESSIBLE_TYPES) and len(body) > 512:
+            self.gzip = gzip.compress(body, compresslevel=9)
+            if brotli is not None:
+                self.br = brotli.compress(body, quality=11)
+
+    def variant(self, encoding: str | None) -> tuple[bytes, str | None]:
+        if encoding == "br" and self.br is not None:
+            return self.br, "br"
+        if encoding in ("br", "gzip") and self.gzip is not None:
+            return self.gzip, "gzip"
+        return self.body, None
+
+
+class StaticAssets:
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._sources = {}
+        self._built = {}
+        self.routes = {}
+
+        for root, _, files in os.walk(directory):
+            for name in files:
+                full_path = os.path.join(root, name)
+                rel_path = os.path.relpath(full_path, directory).replace(os.sep, "/")
+                with open(full_path, "rb") as f:
+                    self._sources[rel_path] = f.read()
+
+        for rel_path in sorted(self._sources):
+            self._build(rel_path, set())
+
+    def _media_type(self, rel_path: str) -> str:
+        media_type = mimetypes.guess_type(rel_path)[0] or "application/octet-stream"
+        if media_type.startswith("text/") or media_type == "application/javascript":
+            media_type += "; charset=utf-8"
+        return media_type
+
+    def _fingerprinted_name(self, rel_path: str, body: bytes) -> str:
+        stem, ext = posixpath.splitext(rel_path)
+        return f"{stem}.{hashlib.sha256(body).hexdigest()[:10]}{ext}"
+
+    def _rewrite(self, rel_path: str, text: str, pattern, visiting: set) -> str:
+        base = posixpath.dirname(rel_path)
+
+        def replace(match):
+            ref = match.group(2)
+            target = posixpath.normpath(posixpath.join(base, ref))
+            if ref.startswith("/") or target not in self._sources or target.endswith(".html"):
+                return match.group(0)
+            fingerprinted = self._build(target, visiting)
+            if fingerprinted is None:
+                return match.group(0)
+            return match.group(1) + posixpath.relpath(fingerprinted, base or ".") + match.group(3)
+
+        return pattern.sub(replace, text)
+
+    def _build(self, rel_path: str, visiting: set) -> str | None:
+        # Returns the fingerprinted path; references are built first so their hashes are final
+        if rel_path in self._built:
+            return self._built[rel_path]
+        if rel_path in visiting:
+            return None
+        visiting.add(rel_path)
+
+        body = self._sources[rel_path]
+        if rel_path.endswith(".html"):
+            body = self._rewrite(rel_path, body.decode("utf-8"), _HTML_REF, visiting).encode("utf-8")
+        elif rel_path.endswith(".css"):
+            body = self._rewrite(rel_path, body.decode("utf-8"), _CSS_REF, visiting).encode("utf-8")
+
+        media_type = self._media_type(rel_path)
+        if rel_path.endswith(".html"):
+            fingerprinted = rel_path
+            asset = Asset(body, media_type, REVALIDATE)
+            self.routes["/" + rel_path] = asset
+            page = rel_path[: -len(".html")]
+            if posixpath.basename(page) == "index":
+                page = posixpath.dirname(page)
+                self.routes["/" + page + ("/" if page else "")] = asset
+            if page:
+                self.routes["/" + page] = asset
+        else:
+            fingerprinted = self._fingerprinted_name(rel_path, body)
+            self.routes["/" + fingerprinted] = Asset(body, media_type, IMMUTABLE)
+            # The original name stays reachable for scripts and external links, revalidated each time
+            self.routes["/" + rel_path] = Asset(body, media_type, REVALIDATE)
+
+        self._built[rel_path] = fingerprinted
+        visiting.discard(rel_path)
+        return fingerprinted
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+        path = scope["path"]
+        root_path = scope.get("root_path", "")
+        if root_path and path.startswith(root_path + "/"):
+            path = path[len(root_path):]
+
+        asset = self.routes.get(path)
+        headers = []
+        if scope["method"] not in ("GET", "HEAD"):
+            status, body, headers = 405, b"Method Not Allowed", [(b"allow", b"GET, HEAD")]
+        elif asset is None:
+            status, body = 404, b"Not Found"
+        else:
+            request_headers = dict(scope["headers"])
+            headers = [
+                (b"etag", asset.etag.encode()),
+                (b"cache-control", asset.cache_control.encode()),
+                (b"vary", b"Accept-Encoding"),
+            ]
+            if_none_match = request_headers.get(b"if-none-match", b"").decode("latin-1")
+            if if_none_match and asset.etag.removeprefix("W/") in if_none_match:
+                status, body = 304, b""
+            else:
+                status = 200
+                encoding = negotiate_encoding(request_headers.get(b"accept-encoding", b"").decode("latin-1"))
+                body, content_encoding = asset.variant(encoding)
+                headers.append((b"content-type", asset.media_type.encode()))
+                if content_encoding:
+                    headers.append((b"content-encoding", content_encoding.encode()))
+
+        if status != 304:
+            headers.append((b"content-length", str(len(body)).encode()))
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else body})
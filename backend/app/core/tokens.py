@@ -0,0 +1,267 @@
+"""Access-token issuing, cached verification and revocation.
+
+Tokens carry the org's token_version plus the status/name/must_change_password snapshot taken at
+login. Decoded claims are kept in a bounded LRU until the token expires, so a repeat request costs a
+dict lookup instead of an HMAC verification.
+
+Every worker holds a compact map of org_id -> (token_version, status, must_change_password) and the
+set of revoked token ids. Every TOKEN_REFRESH_SECONDS it reads only the orgs and revoked tokens
+written since its watermark (organizations.updated_at, revoked_tokens.created_at); every
+TOKEN_FULL_REFRESH_SECONDS it reloads both in full, which also drops deleted orgs and expired
+token ids. A token is
+rejected once its version is behind the org's (password change or reset) or its jti is revoked
+(logout). Claims are only trusted in place of an org lookup while their status and
+must_change_password still match the map, so a suspension takes effect within one refresh interval
+even when it is made outside this service.
+"""
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+
+from app.core.cache import TTLCache, org_cache
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidToken(Exception):
+    pass
+
+
+class TokenClaims:
+    __slots__ = ("org_id", "user_id", "subject", "name", "role", "status", "must_change_password",
+                 "version", "jti", "expires_at")
+
+    def __init__(self, payload: dict):
+        self.org_id = payload.get("org_id")
+        self.user_id = payload.get("uid")
+        self.subject = payload.get("sub")
+        self.name = payload.get("name")
+        self.role = payload.get("role")
+        self.status = payload.get("status")
+        self.must_change_password = payload.get("mcp")
+        # None for tokens issued before claims were versioned; those always take the slow path
+        self.version = payload.get("ver")
+        self.jti = payload.get("jti")
+        self.expires_at = payload.get("exp")
+
+
+_claims_cache = TTLCache(maxsize=settings.TOKEN_CACHE_SIZE, ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+
+def configure():
+    # Rebuild from settings after create_app() overrides
+    global _claims_cache
+    _claims_cache = TTLCache(maxsize=settings.TOKEN_CACHE_SIZE, ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+
+def issue_token(org, expires_delta: timedelta | None = None) -> str:
+    from app.core import security
+
+    return security.create_access_token(
+        subject=org.contact_email,
+        org_id=org.id,
+        role="organization",
+        expires_delta=expires_delta,
+        extra_claims={
+            "uid": org.user_id,
+            "name": org.name,
+            "status": org.status,
+            "mcp": bool(org.must_change_password),
+            "ver": org.token_version or 0,
+            "jti": uuid.uuid4().hex,
+        },
+    )
+
+
+def decode_token(token: str) -> TokenClaims:
+    claims = _claims_cache.get(token)
+    if claims is not None:
+        if claims.expires_at and claims.expires_at <= time.time():
+            _claims_cache.delete(token)
+            raise InvalidToken("Token expired")
+        return claims
+
+    from jose import JWTError, jwt
+
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        raise InvalidToken("Invalid token")
+    claims = TokenClaims(payload)
+    # Stream tickets are signed with the same key but only open /events
+    if not claims.org_id or "purpose" in payload:
+        raise InvalidToken("Invalid token")
+    ttl = claims.expires_at - time.time() if claims.expires_at else None
+    _claims_cache.set(token, claims, ttl=ttl)
+    return claims
+
+
+STREAM_TICKET_PURPOSE = "events"
+
+
+def issue_stream_ticket(claims: TokenClaims) -> str:
+    # EventSource URLs end up in access logs and browser history, so they carry this short-lived
+    # ticket instead of the bearer token. It keeps the session's jti and version, so logout or a
+    # password change still ends the stream, which lives until the session itself expires.
+    from jose import jwt
+
+    expires_at = time.time() + settings.SSE_TICKET_SECONDS
+    if claims.expires_at:
+        expires_at = min(expires_at, claims.expires_at)
+    payload = {
+        "purpose": STREAM_TICKET_PURPOSE,
+        "sub": claims.subject,
+        "org_id": claims.org_id,
+        "uid": claims.user_id,
+        "name": claims.name,
+        "role": claims.role,
+        "status": claims.status,
+        "mcp": claims.must_change_password,
+        "ver": claims.version,
+        "jti": claims.jti,
+        "exp": int(expires_at),
+        "session_exp": claims.expires_at,
+    }
+    return jwt.encode(payload, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+
+def decode_stream_ticket(ticket: str) -> TokenClaims:
+    from jose import JWTError, jwt
+
+    try:
+        payload = jwt.decode(ticket, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        raise InvalidToken("Invalid ticket")
+    if payload.get("purpose") != STREAM_TICKET_PURPOSE or not payload.get("org_id"):
+        raise InvalidToken("Invalid ticket")
+    return TokenClaims({**payload, "exp": payload.get("session_exp")})
+
+
+class RevocationState:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.orgs = {}
+        self.revoked = frozenset()
+        self.loaded = False
+        self.watermark = None
+
+    def replace(self, orgs: dict, revoked: frozenset) -> list:
+        with self._lock:
+            changed = [org_id for org_id, state in orgs.items() if self.loaded and self.orgs.get(org_id) != state]
+            self.orgs = orgs
+            self.revoked = revoked
+            self.loaded = True
+        return changed
+
+    def merge(self, orgs: dict, revoked: frozenset) -> list:
+        with self._lock:
+            changed = [org_id for org_id, state in orgs.items() if self.orgs.get(org_id) != state]
+            if changed:
+                self.orgs = {**self.orgs, **{org_id: orgs[org_id] for org_id in changed}}
+            if not revoked <= self.revoked:
+                self.revoked = self.revoked | revoked
+        return changed
+
+    def advance(self, watermark):
+        if watermark is not None and (self.watermark is None or watermark > self.watermark):
+            self.watermark = watermark
+
+    def forget(self, org_id: int):
+        # After a local write: drop the entry so this worker falls back to a DB check until the next refresh
+        with self._lock:
+            self.orgs = {key: value for key, value in self.orgs.items() if key != org_id}
+
+    def revoke(self, jti: str):
+        with self._lock:
+            self.revoked = self.revoked | {jti}
+
+    def is_revoked(self, claims: TokenClaims) -> bool:
+        if claims.jti and claims.jti in self.revoked:
+            return True
+        current = self.orgs.get(claims.org_id)
+        return current is not None and claims.version is not None and claims.version < current[0]
+
+    def is_fresh(self, claims: TokenClaims) -> bool:
+        current = self.orgs.get(claims.org_id)
+        return current is not None and current == (claims.version, claims.status, claims.must_change_password)
+
+
+revocations = RevocationState()
+
+
+def revoke(db, claims: TokenClaims):
+    from app.db import models
+
+    if not claims.jti:
+        return
+    expires_at = datetime.fromtimestamp(claims.expires_at, tz=timezone.utc) if claims.expires_at else None
+    if db.get(models.RevokedToken, claims.jti) is None:
+        db.add(models.RevokedToken(jti=claims.jti, org_id=claims.org_id, expires_at=expires_at))
+    db.commit()
+    revocations.revoke(claims.jti)
+
+
+# Rows are re-read for this long after the watermark: updated_at is stamped at transaction start, so a
+# slow transaction can commit a row older than one a previous refresh already saw
+REFRESH_OVERLAP = timedelta(seconds=60)
+
+
+async def refresh_revocations(full: bool = True):
+    from app.db import models
+    from app.db.session import AsyncSessionLocal
+
+    since = None if full or revocations.watermark is None else revocations.watermark - REFRESH_OVERLAP
+    org_query = select(
+        models.Organization.id,
+        models.Organization.token_version,
+        models.Organization.status,
+        models.Organization.must_change_password,
+        models.Organization.updated_at,
+    )
+    revoked_query = select(models.RevokedToken.jti, models.RevokedToken.created_at).where(
+        models.RevokedToken.expires_at > datetime.now(timezone.utc)
+    )
+    if since is not None:
+        org_query = org_query.where(models.Organization.updated_at > since)
+        revoked_query = revoked_query.where(models.RevokedToken.created_at > since)
+
+    async with AsyncSessionLocal() as db:
+        org_rows = (await db.execute(org_query)).all()
+        revoked_rows = (await db.execute(revoked_query)).all()
+
+    orgs = {row.id: (row.token_version or 0, row.status, bool(row.must_change_password)) for row in org_rows}
+    revoked = frozenset(row.jti for row in revoked_rows)
+    changed = revocations.replace(orgs, revoked) if since is None else revocations.merge(orgs, revoked)
+    revocations.advance(max(
+        [row.updated_at for row in org_rows if row.updated_at] + [row.created_at for row in revoked_rows if row.created_at],
+        default=None,
+    ))
+    # Also catches status changes made outside this service, which never call invalidate_org
+    for org_id in changed:
+        if org_cache.shared:
+            await asyncio.to_thread(org_cache.invalidate, org_id)
+        else:
+            org_cache.invalidate(org_id)
+
+
+async def run_refresher(stop: asyncio.Event | None = None):
+    stop = stop or asyncio.Event()
+    last_full = None
+    while not stop.is_set():
+        full = last_full is None or time.monotonic() - last_full >= settings.TOKEN_FULL_REFRESH_SECONDS
+        try:
+            await refresh_revocations(full=full)
+            if full:
+                last_full = time.monotonic()
+        except Exception as e:
+            logger.error(f"Token revocation refresh failed: {str(e)}")
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=settings.TOKEN_REFRESH_SECONDS)
+        except asyncio.TimeoutError:
+            pass
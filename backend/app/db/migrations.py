@@ -0,0 +1,277 @@
+"""Versioned schema migrations.
+
+Workers call run_migrations() on boot: when the recorded version is current that is a single
+SELECT. Otherwise one worker takes a Postgres advisory lock and applies the missing steps while
+the others poll for the lock. Run `python -m app.db.migrations` to migrate ahead of a deploy.
+"""
+import logging
+import time
+
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.exc import DBAPIError
+
+from app.core.config import settings
+from app.db import models
+from app.db.session import Base, connect_args, get_engine
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary application-wide key for the migration advisory lock
+MIGRATION_LOCK_KEY = 7240731001
+MIGRATION_LOCK_POLL_SECONDS = 0.5
+
+
+class Migration:
+    def __init__(self, version: int, description: str, apply, transactional: bool = True):
+        self.version = version
+        self.description = description
+        self.apply = apply
+        # Non-transactional steps (e.g. CREATE INDEX CONCURRENTLY) run on an autocommit connection
+        self.transactional = transactional
+
+
+def _is_postgres(conn) -> bool:
+    return conn.dialect.name == "postgresql"
+
+
+def _add_columns(conn, table: str, columns: dict):
+    existing = {c["name"] for c in inspect(conn).get_columns(table)}
+    for name, ddl in columns.items():
+        if name not in existing:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+
+
+def _create_index(name: str, table: str, definition: str, using: str | None = None):
+    def apply(conn):
+        if not _is_postgres(conn):
+            if using is None:
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({definition})"))
+            return
+        # A failed concurrent build leaves an INVALID index behind that IF NOT EXISTS would keep
+        invalid = conn.execute(text(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ), {"name": name}).first()
+        if invalid:
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+        using_clause = f" USING {using}" if using else ""
+        conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table}{using_clause} ({definition})"))
+    return apply
+
+
+def _baseline(conn):
+    # Ensure base tables exist for first-time setup, then patch databases that predate newer columns.
+    Base.metadata.create_all(bind=conn)
+
+    _add_columns(conn, "organizations", {
+        "country": "VARCHAR(100)",
+        "type": "VARCHAR(50)",
+        "website": "VARCHAR(200)",
+        "contact_email": "VARCHAR(200)",
+        "password": "VARCHAR(255)",
+        "otp": "VARCHAR(10)",
+        "otp_expires": "TIMESTAMP WITH TIME ZONE",
+        "must_change_password": "BOOLEAN DEFAULT TRUE",
+    })
+    _add_columns(conn, "grants", {
+        "created_by_type": "VARCHAR(50)",
+        "created_by_id": "INTEGER",
+        "status": "VARCHAR(50)",
+        "category": "VARCHAR(100)",
+    })
+
+
+def _create_email_outbox(conn):
+    models.EmailOutbox.__table__.create(bind=conn, checkfirst=True)
+
+
+SEARCH_BACKFILL_BATCH = 5000
+
+
+def _add_grant_search_vector(conn):
+    if not _is_postgres(conn):
+        return
+    # A GENERATED ... STORED column would rewrite the whole table under ACCESS EXCLUSIVE. Instead add
+    # a nullable column (a catalog-only change), keep it current with a trigger, and backfill
+    # existing rows in short batches so the table stays writable throughout.
+    conn.execute(text("SET lock_timeout = '10s'"))
+    try:
+        conn.execute(text("ALTER TABLE grants ADD COLUMN IF NOT EXISTS search_vector tsvector"))
+    finally:
+        conn.execute(text("RESET lock_timeout"))
+    generated = conn.execute(text(
+        "SELECT attgenerated <> '' FROM pg_attribute "
+        "WHERE attrelid = 'grants'::regclass AND attname = 'search_vector'"
+    )).scalar()
+    if generated:
+        # Created by the earlier version of this migration; Postgres already maintains it
+        return
+    conn.execute(text(
+        "CREATE OR REPLACE FUNCTION grants_search_vector(title text, organizer text, description text, "
+        "eligibility text) RETURNS tsvector LANGUAGE sql IMMUTABLE AS $$ SELECT "
+        "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(organizer, '')), 'B') || "
+        "setweight(to_tsvector('english', coalesce(description, '')), 'C') || "
+        "setweight(to_tsvector('english', coalesce(eligibility, '')), 'D') $$"
+    ))
+    conn.execute(text(
+        "CREATE OR REPLACE FUNCTION grants_search_vector_trigger() RETURNS trigger LANGUAGE plpgsql AS $$ "
+        "BEGIN NEW.search_vector := grants_search_vector(NEW.title, NEW.organizer, NEW.description, "
+        "NEW.eligibility); RETURN NEW; END $$"
+    ))
+    conn.execute(text("DROP TRIGGER IF EXISTS grants_search_vector_update ON grants"))
+    conn.execute(text(
+        "CREATE TRIGGER grants_search_vector_update BEFORE INSERT OR UPDATE OF title, organizer, "
+        "description, eligibility ON grants FOR EACH ROW EXECUTE FUNCTION grants_search_vector_trigger()"
+    ))
+
+    # Rows written from here on are covered by the trigger; walk the id range for the rest
+    max_id = conn.execute(text("SELECT MAX(id) FROM grants")).scalar() or 0
+    for low in range(0, max_id + 1, SEARCH_BACKFILL_BATCH):
+        conn.execute(text(
+            "UPDATE grants SET search_vector = grants_search_vector(title, organizer, description, eligibility) "
+            "WHERE id >= :low AND id < :high AND search_vector IS NULL"
+        ), {"low": low, "high": low + SEARCH_BACKFILL_BATCH})
+
+
+def _add_otp_attempts(conn):
+    _add_columns(conn, "organizations", {"otp_attempts": "INTEGER NOT NULL DEFAULT 0"})
+
+
+def _add_token_revocation(conn):
+    _add_columns(conn, "organizations", {"token_version": "INTEGER NOT NULL DEFAULT 0"})
+    models.RevokedToken.__table__.create(bind=conn, checkfirst=True)
+
+
+def _create_grants_archive(conn):
+    models.GrantArchive.__table__.create(bind=conn, checkfirst=True)
+
+
+def _create_deadline_reminders(conn):
+    models.DeadlineReminder.__table__.create(bind=conn, checkfirst=True)
+
+
+def _touch_organizations_updated_at(conn):
+    if not _is_postgres(conn):
+        return
+    # Writes that bypass the ORM (admin tools, manual SQL) still move updated_at, so token refreshes see them
+    conn.execute(text(
+        "CREATE OR REPLACE FUNCTION organizations_touch_updated_at() RETURNS trigger LANGUAGE plpgsql AS $$ "
+        "BEGIN NEW.updated_at := now(); RETURN NEW; END $$"
+    ))
+    conn.execute(text("DROP TRIGGER IF EXISTS organizations_touch_updated_at ON organizations"))
+    conn.execute(text(
+        "CREATE TRIGGER organizations_touch_updated_at BEFORE INSERT OR UPDATE ON organizations "
+        "FOR EACH ROW EXECUTE FUNCTION organizations_touch_updated_at()"
+    ))
+
+
+MIGRATIONS = [
+    Migration(1, "baseline tables and legacy organization/grant columns", _baseline),
+    Migration(
+        2,
+        "grants (organization_id, status, is_active, created_at) index",
+        _create_index("ix_grants_org_status_active_created", "grants", "organization_id, status, is_active, created_at"),
+        transactional=False,
+    ),
+    Migration(3, "email_outbox table", _create_email_outbox),
+    Migration(
+        4,
+        "grants.search_vector tsvector column, trigger and batched backfill",
+        _add_grant_search_vector,
+        transactional=False,
+    ),
+    Migration(
+        5,
+        "grants.search_vector GIN index",
+        _create_index("ix_grants_search_vector", "grants", "search_vector", using="GIN"),
+        transactional=False,
+    ),
+    Migration(6, "organizations.otp_attempts counter", _add_otp_attempts),
+    Migration(7, "organizations.token_version and revoked_tokens table", _add_token_revocation),
+    Migration(8, "grants_archive table", _create_grants_archive),
+    Migration(9, "deadline_reminders sent-marker table", _create_deadline_reminders),
+    Migration(
+        10,
+        "organizations (updated_at) index",
+        _create_index("ix_organizations_updated_at", "organizations", "updated_at"),
+        transactional=False,
+    ),
+    Migration(11, "organizations.updated_at trigger", _touch_organizations_updated_at),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def _current_version(conn) -> int:
+    try:
+        return conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar() or 0
+    except DBAPIError:
+        conn.rollback()
+        return 0
+
+
+def _migration_engine():
+    # PgBouncer transaction pooling cannot hold a session-level advisory lock, so allow a direct URL
+    url = settings.MIGRATION_DATABASE_URL or settings.DATABASE_URL
+    if url == settings.DATABASE_URL:
+        return get_engine(), False
+    return create_engine(url, connect_args=connect_args(url)), True
+
+
+def _acquire_migration_lock(conn):
+    # Poll rather than block in pg_advisory_lock: a statement waiting on the lock holds a snapshot,
+    # and CREATE INDEX CONCURRENTLY in the holder waits for every older snapshot, so two booting
+    # workers would deadlock
+    waited = False
+    while not conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY}).scalar():
+        if not waited:
+            logger.info("Waiting for another process to finish schema migrations")
+            waited = True
+        time.sleep(MIGRATION_LOCK_POLL_SECONDS)
+
+
+def run_migrations() -> int:
+    with get_engine().connect() as conn:
+        if _current_version(conn) >= LATEST_VERSION:
+            return LATEST_VERSION
+
+    migration_engine, dispose = _migration_engine()
+    try:
+        with migration_engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            if _is_postgres(conn):
+                _acquire_migration_lock(conn)
+            try:
+                conn.execute(text(
+                    "CREATE TABLE IF NOT EXISTS schema_version ("
+                    "version INTEGER PRIMARY KEY, description VARCHAR(255), "
+                    "applied_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP)"
+                ))
+                # Re-read under the lock: another worker may have finished while we waited
+                version = _current_version(conn)
+                for migration in MIGRATIONS:
+                    if migration.version <= version:
+                        continue
+                    logger.info(f"Applying schema migration {migration.version}: {migration.description}")
+                    record = text("INSERT INTO schema_version (version, description) VALUES (:version, :description)")
+                    params = {"version": migration.version, "description": migration.description}
+                    if migration.transactional:
+                        with migration_engine.begin() as tx:
+                            migration.apply(tx)
+                            tx.execute(record, params)
+                    else:
+                        migration.apply(conn)
+                        conn.execute(record, params)
+                    version = migration.version
+            finally:
+                if _is_postgres(conn):
+                    conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+    finally:
+        if dispose:
+            migration_engine.dispose()
+    return LATEST_VERSION
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(f"Schema at version {run_migrations()}")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, JSON, Text, Index, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, JSON, Text, Index, ForeignKey, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.session import Base
@@ -54,10 +54,12 @@ class Grant(Base):
     creator = relationship("User", foreign_keys=[creator_id])
     organization = relationship("Organization", foreign_keys=[organization_id])
 
+    # On Postgres, migrations also add a trigger-maintained search_vector tsvector column with a GIN index
     __table_args__ = (
         Index('ix_grants_verified_active', 'is_verified', 'is_active'),
         Index('ix_grants_country_verified', 'refugee_country', 'is_verified'),
         Index('ix_grants_deadline_verified', 'deadline', 'is_verified'),
+        Index('ix_grants_org_status_active_created', 'organization_id', 'status', 'is_active', 'created_at'),
     )
 
 class Organization(Base):
@@ -77,7 +79,95 @@ class Organization(Base):
     password = Column(String(255), nullable=True)
     otp = Column(String(10), nullable=True)
     otp_expires = Column(DateTime(timezone=True), nullable=True)
+    otp_attempts = Column(Integer, default=0, nullable=False, server_default="0")
     must_change_password = Column(Boolean, default=True)
+    # Bumped on password change/reset; tokens minted with an older version are rejected
+    token_version = Column(Integer, default=0, nullable=False, server_default="0")
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Set on insert too: token revocation refreshes read orgs changed since a watermark on this column
+    updated_at = Column(DateTime(timezone=True), default=func.now(), onupdate=func.now(), index=True)
+
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(50), nullable=False)
+    recipient = Column(String(255), nullable=False, index=True)
+    payload = Column(JSON, nullable=False)
+    # Pending rows sharing a dedup key are coalesced (e.g. repeated OTP resends)
+    dedup_key = Column(String(255), nullable=True, index=True)
+    status = Column(String(20), default="pending", nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(Text, nullable=True)
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index('ix_email_outbox_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+
+
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String(64), primary_key=True)
+    org_id = Column(Integer, nullable=True)
+    expires_at = Column(DateTime(timezone=True), nullable=True, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class GrantArchive(Base):
+    # Cold copy of grants moved out of the hot table by the maintenance job; no FKs or unique keys
+    __tablename__ = "grants_archive"
+
+    id = Column(Integer, primary_key=True)
+    title = Column(String(500), nullable=False)
+    organizer = Column(String(200), nullable=False)
+    deadline = Column(DateTime, nullable=True)
+    description = Column(Text, nullable=True)
+    eligibility = Column(Text, nullable=True)
+    apply_url = Column(String(500), nullable=False)
+    source = Column(String(50), nullable=True)
+    external_id = Column(String(100), nullable=True)
+    refugee_country = Column(String(100), nullable=True)
+    is_verified = Column(Boolean, nullable=True)
+    is_active = Column(Boolean, nullable=True)
+    rejection_reason = Column(Text, nullable=True)
+    creator_id = Column(Integer, nullable=True)
+    organization_id = Column(Integer, nullable=True, index=True)
+    amount = Column(String(100), nullable=True)
+    location = Column(String(200), nullable=True)
+    eligibility_criteria = Column(JSON, nullable=True)
+    required_documents = Column(JSON, nullable=True)
+    created_by_type = Column(String(50), nullable=True)
+    created_by_id = Column(Integer, nullable=True)
+    status = Column(String(50), nullable=True)
+    category = Column(String(100), nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), nullable=True)
+
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class DeadlineReminder(Base):
+    # Sent-marker per grant and reminder window; the unique key keeps the reminder job idempotent.
+    # No FK so purging or archiving grants never has to touch it.
+    __tablename__ = "deadline_reminders"
+
+    id = Column(Integer, primary_key=True)
+    grant_id = Column(Integer, nullable=False)
+    organization_id = Column(Integer, nullable=True)
+    window_days = Column(Integer, nullable=False)
+    deadline = Column(DateTime, nullable=True, index=True)
+    # "pending" while the digest is in flight (and left so if the outcome is unknown), then "sent",
+    # or "failed" when Brevo rejected that org's digest
+    status = Column(String(20), default="pending", nullable=False)
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint('grant_id', 'window_days', name='uq_deadline_reminders_grant_window'),
+    )
@@ -0,0 +1,176 @@
+"""Read-replica routing for read-only async routes.
+
+Set DATABASE_REPLICA_URLS to a comma-separated list of replica URLs. Read routes take their session
+from get_read_db, which picks a random replica whose measured lag is within REPLICA_MAX_LAG_SECONDS
+and falls back to the primary when none qualifies.
+
+Read-your-writes: write routes call pin_primary(org_id) after committing, which sends that org's
+reads to the primary for REPLICA_PIN_SECONDS. The pin is kept per worker and in the redis cache at
+CACHE_URL so every worker honours it; replicas refuse to start without one unless
+REPLICA_LOCAL_PINS is set for a single-process deployment. Clients can also force the primary for a
+single request with an `X-Read-Primary: 1` header.
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core import cache, metrics
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal, _track_pool, async_database_url, connect_args, engine_options
+
+logger = logging.getLogger(__name__)
+
+# Zero when the replica has replayed everything it received; otherwise time since the last replayed commit
+LAG_QUERY = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+class Replica:
+    def __init__(self, index: int, url: str):
+        self.name = f"replica{index}"
+        self.url = url
+        self.host = make_url(url).host or self.name
+        # Created by the first lag check; replicas are only used once measured
+        self.engine = None
+        self.sessionmaker = None
+        self.lag = None
+
+    def _connect(self):
+        self.engine = create_async_engine(
+            async_database_url(self.url),
+            connect_args=connect_args(self.url, is_async=True),
+            **engine_options(is_async=True)
+        )
+        _track_pool(self.engine.sync_engine)
+        metrics.instrument_engine(self.engine.sync_engine, self.name)
+        self.sessionmaker = async_sessionmaker(
+            self.engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+        )
+
+    @property
+    def usable(self) -> bool:
+        return self.lag is not None and self.lag <= settings.REPLICA_MAX_LAG_SECONDS
+
+    async def check_lag(self):
+        if self.engine is None:
+            self._connect()
+        try:
+            async with self.engine.connect() as conn:
+                if conn.dialect.name == "postgresql":
+                    self.lag = float(await conn.scalar(LAG_QUERY) or 0)
+                else:
+                    await conn.execute(text("SELECT 1"))
+                    self.lag = 0.0
+        except Exception as e:
+            logger.warning(f"Replica {self.name} ({self.host}) unavailable: {str(e)}")
+            self.lag = None
+
+
+def build_replicas(urls: list) -> list:
+    if urls and not isinstance(cache.shared_backend, cache.RedisBackend) and not settings.REPLICA_LOCAL_PINS:
+        # A pin set by one worker would be invisible to the others, which would serve stale reads
+        raise ValueError(
+            "DATABASE_REPLICA_URLS needs a redis:// CACHE_URL to share read-your-writes pins across "
+            "workers; set REPLICA_LOCAL_PINS=true for a single-process deployment"
+        )
+    return [Replica(index, url) for index, url in enumerate(urls)]
+
+
+replicas = build_replicas(settings.DATABASE_REPLICA_URLS)
+
+
+def configure():
+    # Rebuild from settings after create_app() overrides (run cache.configure() first)
+    global replicas
+    dispose_after_fork()
+    replicas = build_replicas(settings.DATABASE_REPLICA_URLS)
+
+_pins = {}
+_pins_lock = threading.Lock()
+
+
+def _pin_key(org_id: int) -> str:
+    return f"primary_pin:{org_id}"
+
+
+async def pin_primary(org_id: int):
+    if not replicas:
+        return
+    with _pins_lock:
+        _pins[org_id] = time.monotonic() + settings.REPLICA_PIN_SECONDS
+    if cache.shared_backend:
+        try:
+            await run_in_threadpool(
+                cache.shared_backend.set, _pin_key(org_id), 1, settings.REPLICA_PIN_SECONDS, strict=True
+            )
+        except Exception as e:
+            # The write already committed; other workers route this org by their own pin checks, which
+            # fall back to the primary while the shared cache is down
+            logger.warning(f"Could not share primary pin for org {org_id}: {str(e)}")
+
+
+async def _is_pinned(org_id: int) -> bool:
+    with _pins_lock:
+        until = _pins.get(org_id)
+        if until is not None and until < time.monotonic():
+            del _pins[org_id]
+            until = None
+    if until is not None:
+        return True
+    if cache.shared_backend:
+        try:
+            return bool(await run_in_threadpool(cache.shared_backend.get, _pin_key(org_id), strict=True))
+        except Exception as e:
+            # A pin we cannot read may exist, so read from the primary rather than risk a stale replica
+            logger.warning(f"Could not read primary pin for org {org_id}, using the primary: {str(e)}")
+            return True
+    return False
+
+
+async def read_sessionmaker(org_id: int | None, force_primary: bool = False):
+    if not replicas or force_primary:
+        return AsyncSessionLocal
+    usable = [replica for replica in replicas if replica.usable]
+    if not usable or (org_id is not None and await _is_pinned(org_id)):
+        return AsyncSessionLocal
+    return random.choice(usable).sessionmaker
+
+
+async def run_lag_monitor(stop: asyncio.Event | None = None):
+    stop = stop or asyncio.Event()
+    while not stop.is_set():
+        await asyncio.gather(*(replica.check_lag() for replica in replicas))
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=settings.REPLICA_LAG_CHECK_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def dispose():
+    await asyncio.gather(*(replica.engine.dispose() for replica in replicas if replica.engine is not None))
+
+
+def dispose_after_fork():
+    for replica in replicas:
+        if replica.engine is not None:
+            replica.engine.sync_engine.dispose(close=False)
+
+
+def status() -> list:
+    return [{"name": replica.name, "host": replica.host, "lag_seconds": replica.lag, "usable": replica.usable}
+            for replica in replicas]
+
+
+metrics.REGISTRY.register(metrics.Gauge(
+    "db_replica_lag_seconds", "Replica replay lag; absent when the replica is unreachable.", ("replica",),
+    collect=lambda: {(replica.name,): replica.lag for replica in replicas if replica.lag is not None},
+))
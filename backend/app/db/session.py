@@ -1,14 +1,259 @@
-from sqlalchemy import create_engine
+import threading
+import time
+import uuid
+
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+from app.core import metrics, query_profiler
 from app.core.config import settings
 
-engine = create_engine(
-    settings.DATABASE_URL,
-    poolclass=NullPool,
-    connect_args={
-        "connect_timeout": 60,
+
+class _PoolStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self.wait_seconds_total += seconds
+            if seconds > self.wait_seconds_max:
+                self.wait_seconds_max = seconds
+            if timed_out:
+                self.timeouts += 1
+
+    def incr(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+            }
+
+
+pool_stats = _PoolStats()
+
+
+class _TimedCheckout:
+    # Measures how long a checkout waits for a free connection.
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            # Only pool exhaustion counts; connect failures (refused, bad credentials) pass through
+            pool_stats.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        pool_stats.record_wait(time.perf_counter() - started)
+        return conn
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+def async_database_url(url: str):
+    # asyncpg does not understand libpq-only query parameters such as sslmode
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend == "postgresql":
+        query = dict(url.query)
+        sslmode = query.pop("sslmode", None)
+        query.pop("channel_binding", None)
+        if sslmode:
+            query["ssl"] = sslmode
+        return url.set(drivername="postgresql+asyncpg", query=query)
+    if backend == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+    return url
+
+
+def connect_args(url, is_async: bool = False) -> dict:
+    if make_url(url).get_backend_name() != "postgresql":
+        return {}
+    if not is_async:
+        return {"connect_timeout": settings.DB_CONNECT_TIMEOUT}
+
+    args = {"timeout": settings.DB_CONNECT_TIMEOUT}
+    if settings.DB_PGBOUNCER:
+        # Transaction pooling hands each transaction a different server connection,
+        # so named prepared statements must be disabled or made unique.
+        args.update({
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+        })
+    return args
+
+
+def engine_options(is_async: bool = False) -> dict:
+    if settings.DB_POOL_MODE == "null":
+        return {"poolclass": NullPool}
+    if settings.DB_POOL_MODE != "queue":
+        raise ValueError(f"Unknown DB_POOL_MODE: {settings.DB_POOL_MODE}")
+
+    return {
+        "poolclass": TimedAsyncQueuePool if is_async else TimedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE if is_async else settings.DB_SYNC_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW if is_async else settings.DB_SYNC_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        # PgBouncer validates its own server connections, so skip the extra round trip
+        "pool_pre_ping": settings.DB_POOL_PRE_PING and not settings.DB_PGBOUNCER,
     }
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def _track_pool(target_engine):
+    event.listen(target_engine, "connect", lambda *args: pool_stats.incr("connects"))
+    event.listen(target_engine, "checkout", lambda *args: pool_stats.incr("checkouts"))
+    event.listen(target_engine, "checkin", lambda *args: pool_stats.incr("checkins"))
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def _create_engine():
+    sync_engine = create_engine(
+        settings.DATABASE_URL,
+        connect_args=connect_args(settings.DATABASE_URL),
+        **engine_options()
+    )
+    _track_pool(sync_engine)
+    metrics.instrument_engine(sync_engine, "sync")
+    query_profiler.instrument_engine(sync_engine)
+    return sync_engine
+
+
+def _create_async_engine():
+    engine = create_async_engine(
+        async_database_url(settings.DATABASE_URL),
+        connect_args=connect_args(settings.DATABASE_URL, is_async=True),
+        **engine_options(is_async=True)
+    )
+    _track_pool(engine.sync_engine)
+    metrics.instrument_engine(engine.sync_engine, "async")
+    query_profiler.instrument_engine(engine.sync_engine)
+    return engine
+
+
+def _get(name: str, factory):
+    # Engines (and their driver imports) are created on first use, not at import, so a
+    # preloading master or a CLI that never touches the database stays cheap
+    engine = _engines.get(name)
+    if engine is None:
+        with _engines_lock:
+            engine = _engines.get(name)
+            if engine is None:
+                engine = _engines[name] = factory()
+    return engine
+
+
+def get_engine():
+    return _get("sync", _create_engine)
+
+
+def get_async_engine():
+    return _get("async", _create_async_engine)
+
+
+def dispose_engines(close: bool = True):
+    # After a fork, pass close=False: the child drops the inherited pool without closing
+    # connections the parent still owns (SQLAlchemy's documented multiprocessing pattern)
+    for engine in list(_engines.values()):
+        if isinstance(engine, AsyncEngine):
+            # Async connections can only be closed on their event loop; see dispose_async_engine
+            engine.sync_engine.dispose(close=False)
+        else:
+            engine.dispose(close=close)
+
+
+async def dispose_async_engine():
+    engine = _engines.get("async")
+    if engine is not None:
+        await engine.dispose()
+
+
+def reset_engines():
+    # For settings overrides applied after an engine was created (create_app(**overrides))
+    with _engines_lock:
+        dispose_engines()
+        _engines.clear()
+
+
+class _LazySessionmaker(sessionmaker):
+    def __call__(self, **local_kw):
+        local_kw.setdefault("bind", get_engine())
+        return super().__call__(**local_kw)
+
+
+class _LazyAsyncSessionmaker(async_sessionmaker):
+    def __call__(self, **local_kw):
+        local_kw.setdefault("bind", get_async_engine())
+        return super().__call__(**local_kw)
+
+
+SessionLocal = _LazySessionmaker(autocommit=False, autoflush=False)
+# expire_on_commit=False so attributes stay readable after commit without an implicit (sync) reload
+AsyncSessionLocal = _LazyAsyncSessionmaker(class_=AsyncSession, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
+
+
+def _queue_pool_status(pool) -> dict:
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "max_overflow": pool._max_overflow,
+    }
+
+
+def get_pool_status() -> dict:
+    status = {"mode": settings.DB_POOL_MODE, "pgbouncer": settings.DB_PGBOUNCER}
+    for label, engine in _engines.items():
+        if isinstance(engine.pool, QueuePool):
+            status[label] = _queue_pool_status(engine.pool)
+    status.update(pool_stats.snapshot())
+    return status
+
+
+def _pool_connections() -> dict:
+    values = {}
+    for label, target in list(_engines.items()):
+        if isinstance(target.pool, QueuePool):
+            status = _queue_pool_status(target.pool)
+            for state in ("size", "checked_in", "checked_out", "overflow"):
+                values[(label, state)] = status[state]
+    return values
+
+
+def _pool_counters() -> dict:
+    return {(name,): value for name, value in pool_stats.snapshot().items() if name != "wait_seconds_max"}
+
+
+metrics.REGISTRY.register(metrics.Gauge(
+    "db_pool_connections", "Connection pool occupancy.", ("engine", "state"), collect=_pool_connections,
+))
+metrics.REGISTRY.register(metrics.Counter(
+    "db_pool_events_total", "Pool connects, checkouts, checkins, timeouts and cumulative wait seconds.",
+    ("event",), collect=_pool_counters,
+))
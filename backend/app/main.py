@@ -1,92 +1,133 @@
-from fastapi import FastAPI, Request, Depends, HTTPException
+from fastapi import APIRouter, FastAPI, Request, Depends, HTTPException
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
 import logging
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import raiseload
 
 from app.api import auth, grants
-from app.api.deps import get_db, get_current_org
+from app.core import cache, events, metrics, query_profiler, rate_limit, security, tokens
+from app.core.config import settings
+from app.core.email_dispatcher import email_dispatcher
+from app.core.http_cache import cached_json_response, make_etag, not_modified
+from app.core.rate_limit import RateLimited
+from app.core.static_assets import StaticAssets
+from app.api.deps import OrgPrincipal, get_async_db, get_current_org_async, get_db, get_org_from_token, get_read_db
 from app.db import models
-from app.db.init_db import ensure_schema
+from app.schemas.grant import DashboardOrg, DashboardOut, GrantOut
+from app.db import replicas, session
+from app.db.session import get_pool_status
+from app.workers import outbox
+import asyncio
 import os
-from fastapi.staticfiles import StaticFiles
 
 
-app = FastAPI(title="Relivo Organization Portal API")
+router = APIRouter()
 
-@app.on_event("startup")
 def on_startup():
+    if not settings.MIGRATE_ON_STARTUP:
+        return
+    # Imported here: the migration module is only needed when this worker migrates
+    from app.db.init_db import ensure_schema
     try:
         ensure_schema()
     except Exception as e:
         print(f"Startup error ignored: {e}")
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=False,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-app.include_router(auth.router, prefix="/api")
-app.include_router(grants.router, prefix="/api")
-
-
-@app.get("/api/dashboard_data")
-def dashboard_data(
-    db: Session = Depends(get_db),
-    org: models.Organization = Depends(get_current_org)
+_background_tasks = []
+
+async def start_background_tasks():
+    await events.broker.start()
+    _background_tasks.append(asyncio.create_task(tokens.run_refresher()))
+    if replicas.replicas:
+        _background_tasks.append(asyncio.create_task(replicas.run_lag_monitor()))
+    if settings.EMAIL_OUTBOX_INPROCESS:
+        _background_tasks.append(asyncio.create_task(outbox.run_forever(email_dispatcher)))
+
+async def on_shutdown():
+    for task in _background_tasks:
+        task.cancel()
+    await asyncio.gather(*_background_tasks, return_exceptions=True)
+    _background_tasks.clear()
+    await email_dispatcher.aclose()
+    await events.broker.stop()
+    security.shutdown_hashing()
+    await session.dispose_async_engine()
+    await replicas.dispose()
+
+def hashing_busy_handler(request: Request, exc: security.HashingBusy):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server busy, please retry shortly"},
+        headers={"Retry-After": "1"},
+    )
+
+def rate_limited_handler(request: Request, exc: RateLimited):
+    return JSONResponse(
+        status_code=429,
+        content={"detail": "Too many attempts, please try again later"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+@router.get("/api/dashboard_data", response_model=DashboardOut)
+async def dashboard_data(
+    request: Request,
+    db: AsyncSession = Depends(get_read_db),
+    org: OrgPrincipal = Depends(get_current_org_async)
 ):
-    grants_query = db.query(models.Grant).filter(models.Grant.organization_id == org.id)
-    grants_list = grants_query.order_by(models.Grant.created_at.desc()).all()
-    total_grants = grants_query.count()
-    active_grants = grants_query.filter(models.Grant.is_active.is_(True)).count()
-    inactive_grants = total_grants - active_grants
-    
-    trash_count = grants_query.filter(models.Grant.status == "DELETION_PENDING").count()
-    total_visible = total_grants - trash_count
-
-    return {
-        "org": {
-            "name": org.name,
-            "contact_email": org.contact_email,
-            "country": org.country,
-            "status": org.status,
-        },
-        "must_change_password": org.must_change_password,
-        "grants": [{
-            "id": g.id,
-            "title": g.title,
-            "description": g.description,
-            "eligibility": g.eligibility,
-            "organizer": g.organizer,
-            "is_active": g.is_active,
-            "status": g.status or "LIVE",
-            "amount": g.amount,
-            "deadline": g.deadline,
-            "apply_url": g.apply_url,
-            "refugee_country": g.refugee_country,
-            "category": g.category
-        } for g in grants_list],
-        "total_grants": total_visible,
-        "active_grants": active_grants,
-        "inactive_grants": total_visible - active_grants,
-        "trash_count": trash_count
-    }
-
-@app.get("/api/grants/{grant_id}")
-def get_grant(
+    total_grants, active_grants, trash_count, last_modified = await grants.grant_counters(db, org.id)
+    etag = make_etag(
+        "dashboard", org.name, org.contact_email, org.country, org.status, org.must_change_password,
+        total_grants, active_grants, trash_count, last_modified,
+    )
+    cached = not_modified(request, etag, last_modified)
+    if cached:
+        return cached
+
+    # Only the first page of each tab; the frontend pages through /api/org/grants for the rest
+    live_grants, next_cursor = await grants.list_org_grants(db, org.id, trash=False, full=True)
+    trashed_grants, trash_next_cursor = await grants.list_org_grants(db, org.id, trash=True, full=True)
+
+    return cached_json_response(request, DashboardOut(
+        org=DashboardOrg(
+            name=org.name,
+            contact_email=org.contact_email,
+            country=org.country,
+            status=org.status,
+        ),
+        must_change_password=org.must_change_password,
+        grants=live_grants + trashed_grants,
+        next_cursor=next_cursor,
+        trash_next_cursor=trash_next_cursor,
+        **grants.counters_payload(total_grants, active_grants, trash_count),
+    ), etag, last_modified)
+
+@router.get("/api/grants/{grant_id}", response_model=GrantOut)
+async def get_grant(
+    request: Request,
     grant_id: int,
-    db: Session = Depends(get_db),
-    org: models.Organization = Depends(get_current_org)
+    db: AsyncSession = Depends(get_read_db),
+    org: OrgPrincipal = Depends(get_org_from_token)
 ):
-    grant = db.query(models.Grant).filter(models.Grant.id == grant_id, models.Grant.organization_id == org.id).first()
+    result = await db.execute(
+        select(models.Grant)
+        .where(models.Grant.id == grant_id, models.Grant.organization_id == org.id)
+        .options(raiseload("*"))
+    )
+    grant = result.scalar_one_or_none()
     if not grant:
         raise HTTPException(status_code=404, detail="Grant not found")
-    return grant
 
-@app.get("/health/email")
+    last_modified = grant.updated_at or grant.created_at
+    etag = make_etag("grant", grant.id, last_modified)
+    return not_modified(request, etag, last_modified) or cached_json_response(
+        request, GrantOut.model_validate(grant), etag, last_modified
+    )
+
+@router.get("/health/email")
 def test_email(email: str, db: Session = Depends(get_db)):
     from app.core.email_utils import send_otp_email
     try:
@@ -96,7 +137,7 @@ def test_email(email: str, db: Session = Depends(get_db)):
         return {"status": "error", "message": str(e)}
 
 
-@app.get("/health")
+@router.get("/health")
 def health_check(db: Session = Depends(get_db)):
     try:
         db.execute(text("SELECT 1"))
@@ -104,15 +145,97 @@ def health_check(db: Session = Depends(get_db)):
     except Exception as exc:
         return {"status": "degraded", "database": "unreachable", "error": str(exc)}
 
-# Serve frontend static files
-# Try local path first, fallback to common Render/Docker paths if needed
-frontend_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "frontend"))
-if not os.path.exists(frontend_path):
-    # Fallback if running from a different directory
-    frontend_path = os.path.abspath(os.path.join(os.getcwd(), "frontend"))
-
-if os.path.exists(frontend_path):
-    app.mount("/", StaticFiles(directory=frontend_path, html=True), name="frontend")
-else:
-    print(f"Warning: Frontend path {frontend_path} not found.")
 
+@router.get("/metrics", include_in_schema=False)
+async def metrics_endpoint(request: Request, db: AsyncSession = Depends(get_async_db)):
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if settings.METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {settings.METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    pending = await db.scalar(
+        select(func.count(models.EmailOutbox.id)).where(models.EmailOutbox.status.in_(("pending", "sending")))
+    )
+    metrics.email_outbox_pending.set(pending or 0)
+    return Response(content=metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+@router.get("/health/pool")
+def pool_status():
+    status = get_pool_status()
+    if replicas.replicas:
+        status["replicas"] = replicas.status()
+    return status
+
+def frontend_path() -> str | None:
+    if settings.FRONTEND_DIR:
+        return settings.FRONTEND_DIR if os.path.isdir(settings.FRONTEND_DIR) else None
+    # Repo layout first, then the working directory (Render/Docker)
+    for path in (
+        os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "frontend")),
+        os.path.abspath(os.path.join(os.getcwd(), "frontend")),
+    ):
+        if os.path.isdir(path):
+            return path
+    return None
+
+
+def _rebuild_from_settings():
+    # Objects the modules build from settings at import; other settings are read at call time
+    session.reset_engines()
+    cache.configure()
+    rate_limit.configure()
+    events.configure()
+    email_dispatcher.configure()
+    replicas.configure()
+    tokens.configure()
+    security.configure()
+
+
+def create_app(**overrides) -> FastAPI:
+    """Build the API app. Keyword arguments override settings (e.g. DATABASE_URL) and rebuild the
+    process-wide objects derived from them, so call it before serving, not on a running app. Engines
+    are created on first use, so `gunicorn --preload` forks before any connection exists (see
+    gunicorn.conf.py)."""
+    if overrides:
+        settings.configure(**overrides)
+        _rebuild_from_settings()
+
+    app = FastAPI(title="Relivo Organization Portal API", default_response_class=ORJSONResponse)
+    app.add_event_handler("startup", on_startup)
+    app.add_event_handler("startup", start_background_tasks)
+    app.add_event_handler("shutdown", on_shutdown)
+    app.add_exception_handler(security.HashingBusy, hashing_busy_handler)
+    app.add_exception_handler(RateLimited, rate_limited_handler)
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=False,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    if settings.SQL_PROFILING:
+        app.add_middleware(query_profiler.QueryProfilerMiddleware)
+
+    if settings.METRICS_ENABLED:
+        app.add_middleware(metrics.MetricsMiddleware)
+
+    app.include_router(auth.router, prefix="/api")
+    app.include_router(grants.router, prefix="/api")
+    app.include_router(router)
+
+    # Serve frontend static files
+    path = frontend_path()
+    if path:
+        app.mount("/", StaticAssets(path), name="frontend")
+    else:
+        print("Warning: Frontend directory not found.")
+    return app
+
+
+def __getattr__(name: str):
+    # Keeps `uvicorn app.main:app` working; the app is built on first access, not at import
+    if name == "app":
+        app = globals()["app"] = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,25 +1,103 @@
-from pydantic import BaseModel
-from typing import Optional
-from datetime import datetime
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+from typing import Any, List, Optional
+from datetime import datetime, timezone
 
+
+def naive_utc(value: datetime | None) -> datetime | None:
+    # grants.deadline is timestamp without time zone; asyncpg rejects aware datetimes for it
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+# Lengths match the grants columns so oversized values fail validation instead of the INSERT
 class GrantCreate(BaseModel):
-    title: str
-    organizer: Optional[str] = None
-    apply_url: str
+    title: str = Field(..., max_length=500)
+    organizer: Optional[str] = Field(None, max_length=200)
+    apply_url: str = Field(..., max_length=500)
     deadline: Optional[datetime] = None
     description: Optional[str] = None
     eligibility: Optional[str] = None
-    refugee_country: Optional[str] = None
-    amount: Optional[str] = None
-    category: Optional[str] = None
+    refugee_country: Optional[str] = Field(None, max_length=100)
+    amount: Optional[str] = Field(None, max_length=100)
+    category: Optional[str] = Field(None, max_length=100)
 
 class GrantUpdate(BaseModel):
-    title: Optional[str] = None
-    organizer: Optional[str] = None
-    apply_url: Optional[str] = None
+    title: Optional[str] = Field(None, max_length=500)
+    organizer: Optional[str] = Field(None, max_length=200)
+    apply_url: Optional[str] = Field(None, max_length=500)
     deadline: Optional[datetime] = None
     description: Optional[str] = None
     eligibility: Optional[str] = None
-    refugee_country: Optional[str] = None
+    refugee_country: Optional[str] = Field(None, max_length=100)
+    amount: Optional[str] = Field(None, max_length=100)
+    category: Optional[str] = Field(None, max_length=100)
+
+class GrantImportRow(GrantCreate):
+    external_id: Optional[str] = Field(None, max_length=100)
+
+    @field_validator("deadline")
+    @classmethod
+    def _deadline_naive_utc(cls, value):
+        return naive_utc(value)
+
+class GrantIdList(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=1000)
+
+
+# Response models. Only scalar columns are listed, so serializing an ORM Grant never touches
+# the creator/organization relationships.
+class GrantSummaryOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    title: str
+    organizer: Optional[str] = None
+    is_active: Optional[bool] = None
+    status: Optional[str] = None
     amount: Optional[str] = None
+    deadline: Optional[datetime] = None
+    apply_url: Optional[str] = None
+    refugee_country: Optional[str] = None
     category: Optional[str] = None
+
+class GrantFullOut(GrantSummaryOut):
+    description: Optional[str] = None
+    eligibility: Optional[str] = None
+
+class GrantOut(GrantFullOut):
+    source: Optional[str] = None
+    external_id: Optional[str] = None
+    is_verified: Optional[bool] = None
+    rejection_reason: Optional[str] = None
+    creator_id: Optional[int] = None
+    organization_id: Optional[int] = None
+    location: Optional[str] = None
+    eligibility_criteria: Optional[Any] = None
+    required_documents: Optional[Any] = None
+    created_by_type: Optional[str] = None
+    created_by_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+class GrantPage(BaseModel):
+    # Items are GrantSummaryOut or GrantFullOut depending on ?view=
+    grants: List[GrantFullOut]
+    next_cursor: Optional[str] = None
+
+class DashboardOrg(BaseModel):
+    name: Optional[str] = None
+    contact_email: Optional[str] = None
+    country: Optional[str] = None
+    status: Optional[str] = None
+
+class DashboardOut(BaseModel):
+    org: DashboardOrg
+    must_change_password: Optional[bool] = None
+    grants: List[GrantFullOut]
+    next_cursor: Optional[str] = None
+    trash_next_cursor: Optional[str] = None
+    total_grants: int
+    active_grants: int
+    inactive_grants: int
+    trash_count: int
@@ -0,0 +1,239 @@
+"""Table maintenance job.
+
+Run from cron (e.g. a Render cron job) with `python -m app.workers.maintenance`, or keep it running
+with `--every 3600`. Each task works in short id-batched transactions so row locks and WAL bursts
+stay small, then the touched tables are analyzed so the planner sees the smaller tables.
+
+Tasks:
+  trash    delete grants left in DELETION_PENDING longer than MAINTENANCE_TRASH_RETENTION_DAYS
+  expired  deactivate org grants whose deadline passed MAINTENANCE_EXPIRED_GRACE_DAYS ago
+  archive  move org grants past their deadline by MAINTENANCE_ARCHIVE_AFTER_DAYS into grants_archive
+  tokens   delete expired revoked_tokens rows
+  outbox   delete sent/failed email_outbox rows older than MAINTENANCE_OUTBOX_RETENTION_DAYS
+  reminders delete deadline_reminders markers for deadlines that have passed
+
+expired and archive skip grants with no organization_id (scraped or admin-created listings managed
+elsewhere) unless MAINTENANCE_INCLUDE_UNOWNED_GRANTS is on.
+"""
+import argparse
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, func, insert, or_, select, text, update
+
+from app.core.config import settings
+from app.db import models
+from app.db.session import get_engine
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary application-wide key for pg_try_advisory_lock; distinct from the migration lock
+MAINTENANCE_LOCK_KEY = 7240731002
+TASKS = ("trash", "expired", "archive", "tokens", "outbox", "reminders")
+ARCHIVE_COLUMNS = [c.name for c in models.GrantArchive.__table__.columns if c.name != "archived_at"]
+
+
+def _not_trashed():
+    return or_(models.Grant.status != "DELETION_PENDING", models.Grant.status.is_(None))
+
+
+def _expiry_scope():
+    criteria = [_not_trashed()]
+    if not settings.MAINTENANCE_INCLUDE_UNOWNED_GRANTS:
+        criteria.append(models.Grant.organization_id.is_not(None))
+    return criteria
+
+
+def _in_batches(id_query, apply, batch_size: int, dry_run: bool) -> int:
+    # id_query must only match rows apply() will change, so each pass picks up the next batch
+    if dry_run:
+        with get_engine().connect() as conn:
+            return conn.scalar(select(func.count()).select_from(id_query.order_by(None).subquery()))
+
+    total = 0
+    while True:
+        with get_engine().begin() as conn:
+            ids = list(conn.scalars(id_query.limit(batch_size)))
+            if not ids:
+                break
+            apply(conn, ids)
+        total += len(ids)
+        if len(ids) < batch_size:
+            break
+        time.sleep(settings.MAINTENANCE_BATCH_PAUSE_SECONDS)
+    return total
+
+
+def purge_trash(batch_size: int, dry_run: bool = False) -> int:
+    cutoff = datetime.now(timezone.utc) - timedelta(days=settings.MAINTENANCE_TRASH_RETENTION_DAYS)
+    # Trashing bumps updated_at, so it doubles as the time the grant entered the trash
+    ids = (
+        select(models.Grant.id)
+        .where(
+            models.Grant.status == "DELETION_PENDING",
+            func.coalesce(models.Grant.updated_at, models.Grant.created_at) < cutoff,
+        )
+        .order_by(models.Grant.id)
+    )
+    return _in_batches(
+        ids, lambda conn, batch: conn.execute(delete(models.Grant).where(models.Grant.id.in_(batch))),
+        batch_size, dry_run,
+    )
+
+
+def deactivate_expired(batch_size: int, dry_run: bool = False) -> int:
+    # deadline is stored as naive UTC
+    cutoff = datetime.utcnow() - timedelta(days=settings.MAINTENANCE_EXPIRED_GRACE_DAYS)
+    ids = (
+        select(models.Grant.id)
+        .where(models.Grant.deadline < cutoff, models.Grant.is_active.is_(True), *_expiry_scope())
+        .order_by(models.Grant.id)
+    )
+    return _in_batches(
+        ids,
+        lambda conn, batch: conn.execute(
+            update(models.Grant).where(models.Grant.id.in_(batch)).values(is_active=False)
+        ),
+        batch_size, dry_run,
+    )
+
+
+def archive_expired(batch_size: int, dry_run: bool = False) -> int:
+    if settings.MAINTENANCE_ARCHIVE_AFTER_DAYS <= 0:
+        return 0
+    cutoff = datetime.utcnow() - timedelta(days=settings.MAINTENANCE_ARCHIVE_AFTER_DAYS)
+    ids = (
+        select(models.Grant.id)
+        .where(models.Grant.deadline < cutoff, *_expiry_scope())
+        .order_by(models.Grant.id)
+    )
+
+    def move(conn, batch):
+        grant_columns = [models.Grant.__table__.c[name] for name in ARCHIVE_COLUMNS]
+        conn.execute(
+            insert(models.GrantArchive).from_select(
+                ARCHIVE_COLUMNS, select(*grant_columns).where(models.Grant.id.in_(batch))
+            )
+        )
+        conn.execute(delete(models.Grant).where(models.Grant.id.in_(batch)))
+
+    return _in_batches(ids, move, batch_size, dry_run)
+
+
+def purge_revoked_tokens(batch_size: int, dry_run: bool = False) -> int:
+    ids = (
+        select(models.RevokedToken.jti)
+        .where(models.RevokedToken.expires_at < datetime.now(timezone.utc))
+        .order_by(models.RevokedToken.jti)
+    )
+    return _in_batches(
+        ids, lambda conn, batch: conn.execute(delete(models.RevokedToken).where(models.RevokedToken.jti.in_(batch))),
+        batch_size, dry_run,
+    )
+
+
+def purge_outbox(batch_size: int, dry_run: bool = False) -> int:
+    cutoff = datetime.now(timezone.utc) - timedelta(days=settings.MAINTENANCE_OUTBOX_RETENTION_DAYS)
+    ids = (
+        select(models.EmailOutbox.id)
+        .where(models.EmailOutbox.status.in_(("sent", "failed")), models.EmailOutbox.created_at < cutoff)
+        .order_by(models.EmailOutbox.id)
+    )
+    return _in_batches(
+        ids, lambda conn, batch: conn.execute(delete(models.EmailOutbox).where(models.EmailOutbox.id.in_(batch))),
+        batch_size, dry_run,
+    )
+
+
+def purge_reminders(batch_size: int, dry_run: bool = False) -> int:
+    # The reminder job only looks at future deadlines, so markers for past ones are never read again
+    cutoff = datetime.utcnow() - timedelta(days=settings.MAINTENANCE_EXPIRED_GRACE_DAYS)
+    ids = (
+        select(models.DeadlineReminder.id)
+        .where(models.DeadlineReminder.deadline < cutoff)
+        .order_by(models.DeadlineReminder.id)
+    )
+    return _in_batches(
+        ids,
+        lambda conn, batch: conn.execute(delete(models.DeadlineReminder).where(models.DeadlineReminder.id.in_(batch))),
+        batch_size, dry_run,
+    )
+
+
+RUNNERS = {
+    "trash": (purge_trash, ("grants",)),
+    "expired": (deactivate_expired, ("grants",)),
+    "archive": (archive_expired, ("grants", "grants_archive")),
+    "tokens": (purge_revoked_tokens, ("revoked_tokens",)),
+    "outbox": (purge_outbox, ("email_outbox",)),
+    "reminders": (purge_reminders, ("deadline_reminders",)),
+}
+
+
+def analyze(tables: set, vacuum: bool = False):
+    with get_engine().connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if conn.dialect.name != "postgresql":
+            conn.execute(text("ANALYZE"))
+            return
+        command = "VACUUM (ANALYZE)" if vacuum else "ANALYZE"
+        for table in sorted(tables):
+            conn.execute(text(f"{command} {table}"))
+
+
+def run(tasks, batch_size: int, dry_run: bool = False, vacuum: bool = False) -> dict | None:
+    with get_engine().connect().execution_options(isolation_level="AUTOCOMMIT") as lock_conn:
+        postgres = lock_conn.dialect.name == "postgresql"
+        if postgres and not lock_conn.execute(
+            text("SELECT pg_try_advisory_lock(:key)"), {"key": MAINTENANCE_LOCK_KEY}
+        ).scalar():
+            logger.info("Another maintenance run holds the lock; skipping")
+            return None
+        try:
+            results = {}
+            touched = set()
+            for task in tasks:
+                runner, tables = RUNNERS[task]
+                started = time.perf_counter()
+                results[task] = runner(batch_size, dry_run)
+                verb = "would affect" if dry_run else "affected"
+                logger.info(f"{task}: {verb} {results[task]} rows in {time.perf_counter() - started:.1f}s")
+                if results[task]:
+                    touched.update(tables)
+            if touched and not dry_run:
+                analyze(touched, vacuum)
+            return results
+        finally:
+            if postgres:
+                lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MAINTENANCE_LOCK_KEY})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    # No choices=: argparse rejects an empty nargs="*" list against them, so validate below
+    parser.add_argument("tasks", nargs="*", metavar="task", help=f"any of {', '.join(TASKS)} (default: all)")
+    parser.add_argument("--batch-size", type=int, default=settings.MAINTENANCE_BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="count matching rows without changing anything")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM (ANALYZE) instead of ANALYZE on Postgres")
+    parser.add_argument("--every", type=float, help="repeat every N seconds instead of running once")
+    args = parser.parse_args()
+    unknown = sorted(set(args.tasks) - set(TASKS))
+    if unknown:
+        parser.error(f"unknown task(s): {', '.join(unknown)}")
+
+    tasks = args.tasks or list(TASKS)
+    if not args.every:
+        run(tasks, args.batch_size, args.dry_run, args.vacuum)
+        return
+    while True:
+        try:
+            run(tasks, args.batch_size, args.dry_run, args.vacuum)
+        except Exception:
+            # A failed pass (database restart, lock timeout) must not stop the schedule
+            logger.exception("Maintenance run failed; retrying on the next interval")
+        time.sleep(args.every)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
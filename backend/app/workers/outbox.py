@@ -0,0 +1,148 @@
+"""Email outbox worker.
+
+Run standalone with `python -m app.workers.outbox` (set EMAIL_OUTBOX_INPROCESS=false on the
+web service), or let the web app drain it in-process.
+
+Rows are claimed in one short transaction (status "sending", leased until
+EMAIL_OUTBOX_LEASE_SECONDS via next_attempt_at), posted with no transaction open, and the outcomes
+recorded in a second one. A worker that dies mid-send leaves its rows to be retried once the lease
+runs out, so delivery is at least once.
+"""
+import asyncio
+import logging
+import signal
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, update
+
+from app.core.config import settings
+from app.core.email_dispatcher import EmailDeliveryError, EmailDispatcher, email_dispatcher
+from app.db import models
+from app.db.session import AsyncSessionLocal, dispose_async_engine
+
+logger = logging.getLogger(__name__)
+
+_wakeup = None
+_wakeup_loop = None
+
+
+def wake():
+    # Called after a commit that queued email so the in-process drainer does not wait for the next poll
+    event, loop = _wakeup, _wakeup_loop
+    if event is not None:
+        loop.call_soon_threadsafe(event.set)
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=min(3600, settings.EMAIL_RETRY_BACKOFF_SECONDS * (2 ** attempts)))
+
+
+async def _claim(batch_size: int) -> list:
+    async with AsyncSessionLocal() as db:
+        now = datetime.now(timezone.utc)
+        # A "sending" row whose lease ran out belongs to a worker that died mid-send; take it over.
+        # SKIP LOCKED lets any number of workers claim from the table without picking the same rows.
+        result = await db.execute(
+            select(models.EmailOutbox)
+            .where(
+                models.EmailOutbox.status.in_(("pending", "sending")),
+                models.EmailOutbox.next_attempt_at <= now,
+            )
+            .order_by(models.EmailOutbox.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        rows = result.scalars().all()
+        lease_until = now + timedelta(seconds=settings.EMAIL_OUTBOX_LEASE_SECONDS)
+        claimed = []
+        for row in rows:
+            row.status = "sending"
+            row.next_attempt_at = lease_until
+            row.attempts += 1
+            claimed.append((row.id, row.attempts, row.kind, row.recipient, row.payload))
+        await db.commit()
+        return claimed
+
+
+async def _record(claimed: list, outcomes: list):
+    async with AsyncSessionLocal() as db:
+        now = datetime.now(timezone.utc)
+        for (row_id, attempts, kind, recipient, _), outcome in zip(claimed, outcomes):
+            if not isinstance(outcome, Exception):
+                values = {"status": "sent", "sent_at": now, "last_error": None}
+            else:
+                error = str(outcome)[:1000]
+                retryable = not isinstance(outcome, EmailDeliveryError) or outcome.retryable
+                if retryable and attempts < settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+                    values = {"status": "pending", "next_attempt_at": now + _retry_delay(attempts), "last_error": error}
+                else:
+                    values = {"status": "failed", "last_error": error}
+                    logger.error(f"Giving up on {kind} email {row_id} to {recipient}: {error}")
+            # Matching attempts skips rows another worker took over after our lease expired
+            await db.execute(
+                update(models.EmailOutbox)
+                .where(
+                    models.EmailOutbox.id == row_id,
+                    models.EmailOutbox.status == "sending",
+                    models.EmailOutbox.attempts == attempts,
+                )
+                .values(**values)
+            )
+        await db.commit()
+
+
+async def drain_once(dispatcher: EmailDispatcher, batch_size: int | None = None) -> int:
+    batch_size = batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE
+    # Claim and commit first so no row lock is held while posting; queue_email's dedup update
+    # only touches "pending" rows and never waits on a send in flight
+    claimed = await _claim(batch_size)
+    if not claimed:
+        return 0
+    outcomes = await asyncio.gather(
+        *(dispatcher.post(payload) for _, _, _, _, payload in claimed), return_exceptions=True
+    )
+    await _record(claimed, outcomes)
+    return len(claimed)
+
+
+async def run_forever(dispatcher: EmailDispatcher, stop: asyncio.Event | None = None):
+    global _wakeup, _wakeup_loop
+    _wakeup = asyncio.Event()
+    _wakeup_loop = asyncio.get_running_loop()
+    stop = stop or asyncio.Event()
+
+    try:
+        while not stop.is_set():
+            try:
+                sent = await drain_once(dispatcher)
+            except Exception as e:
+                logger.error(f"Outbox drain failed: {str(e)}")
+                sent = 0
+            if sent >= settings.EMAIL_OUTBOX_BATCH_SIZE:
+                continue
+            _wakeup.clear()
+            try:
+                await asyncio.wait_for(_wakeup.wait(), timeout=settings.EMAIL_OUTBOX_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        _wakeup = None
+        _wakeup_loop = None
+
+
+async def main():
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    try:
+        await run_forever(email_dispatcher, stop)
+    finally:
+        await email_dispatcher.aclose()
+        await dispose_async_engine()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
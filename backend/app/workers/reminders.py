@@ -0,0 +1,277 @@
+"""Deadline reminder job.
+
+Run from cron (e.g. hourly) with `python -m app.workers.reminders`, or keep it running with
+`--every 3600`. Grants closing within one of DEADLINE_REMINDER_WINDOWS days are found with chunked
+range scans on grants.deadline (ix_grants_deadline_verified), grouped per organization and sent as
+one digest per org through Brevo's batch endpoint (messageVersions), DEADLINE_REMINDER_BATCH_SIZE
+orgs per call.
+
+Each grant is reminded once per window. The deadline_reminders row is claimed before the send and
+released when the send certainly failed (connection refused, 5xx/429 after retries, auth errors),
+so the next run retries it. When Brevo rejects a batch with another 4xx, the batch is split in
+halves until the offending org digests are isolated; their claims are marked "failed" and everyone
+else's digest still goes out. Claims are kept when the outcome is unknown (a read timeout, a crash
+between the send and the commit): at most once, never twice.
+
+--brevo-url (or BREVO_API_URL) points the job at a local stand-in, e.g. bench.api's mock server.
+"""
+import argparse
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import and_, delete, insert, or_, select, text, update
+
+from app.core.config import settings
+from app.core.email_dispatcher import EmailDeliveryError, EmailDispatcher
+from app.core.email_utils import batch_email_payload, deadline_digest_version
+from app.db import models
+from app.db.session import AsyncSessionLocal, dispose_async_engine, get_async_engine
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary application-wide key for pg_try_advisory_lock; distinct from migrations and maintenance
+REMINDER_LOCK_KEY = 7240731003
+SKIPPED_ORG_STATUSES = ("suspended", "rejected")
+# Account-level rejections; splitting the batch cannot help, so release the claims for the next run
+UNSPLITTABLE_STATUS = {401, 402, 403}
+
+
+def window_for(deadline: datetime, now: datetime, windows: list) -> int | None:
+    # The tightest window the deadline falls in; windows are sorted ascending
+    for days in windows:
+        if deadline < now + timedelta(days=days):
+            return days
+    return None
+
+
+async def scan_due(db, now: datetime, windows: list, chunk_size: int):
+    """Yield chunks of (grant row, window) that still need a reminder, soonest deadline first."""
+    horizon = now + timedelta(days=windows[-1])
+    after = None
+    while True:
+        # Keyset over (deadline, id): every chunk is a bounded range scan on the deadline index
+        criteria = [
+            models.Grant.deadline >= now,
+            models.Grant.deadline < horizon,
+            models.Grant.is_verified.is_(True),
+            models.Grant.is_active.is_(True),
+            models.Grant.organization_id.is_not(None),
+            or_(models.Grant.status != "DELETION_PENDING", models.Grant.status.is_(None)),
+        ]
+        if after:
+            criteria.append(or_(
+                models.Grant.deadline > after[0],
+                and_(models.Grant.deadline == after[0], models.Grant.id > after[1]),
+            ))
+        rows = (await db.execute(
+            select(models.Grant.id, models.Grant.organization_id, models.Grant.title, models.Grant.deadline)
+            .where(*criteria)
+            .order_by(models.Grant.deadline, models.Grant.id)
+            .limit(chunk_size)
+        )).all()
+        if not rows:
+            return
+        after = (rows[-1].deadline, rows[-1].id)
+
+        reminded = defaultdict(set)
+        markers = await db.execute(
+            select(models.DeadlineReminder.grant_id, models.DeadlineReminder.window_days)
+            .where(models.DeadlineReminder.grant_id.in_([row.id for row in rows]))
+        )
+        for grant_id, days in markers:
+            reminded[grant_id].add(days)
+
+        due = []
+        for row in rows:
+            days = window_for(row.deadline, now, windows)
+            # Already reminded for this window or a tighter one (e.g. the deadline was moved out)
+            if days is not None and not any(sent <= days for sent in reminded[row.id]):
+                due.append((row, days))
+        yield due
+        if len(rows) < chunk_size:
+            return
+
+
+async def _deliver(dispatcher: EmailDispatcher, orgs: list, digests: dict, max_listed: int, outcomes: dict):
+    # Fills outcomes[org_id] with "sent", "rejected", "released" or "unknown"
+    versions = [
+        deadline_digest_version(
+            org.contact_email, org.name, [(row.title, row.deadline) for row, _ in digests[org.id]], max_listed,
+        )
+        for org in orgs
+    ]
+    try:
+        await dispatcher.deliver(batch_email_payload(versions), retry_ambiguous=False)
+    except EmailDeliveryError as e:
+        if e.ambiguous:
+            logger.error(f"Deadline digest batch for {len(orgs)} orgs may or may not have been sent: {str(e)}")
+            outcome = "unknown"
+        elif e.retryable or e.status in UNSPLITTABLE_STATUS:
+            logger.error(f"Deadline digest batch for {len(orgs)} orgs failed: {str(e)}")
+            outcome = "released"
+        elif len(orgs) > 1:
+            middle = len(orgs) // 2
+            await _deliver(dispatcher, orgs[:middle], digests, max_listed, outcomes)
+            await _deliver(dispatcher, orgs[middle:], digests, max_listed, outcomes)
+            return
+        else:
+            logger.error(f"Deadline digest for org {orgs[0].id} rejected: {str(e)}")
+            outcome = "rejected"
+    except Exception as e:
+        logger.error(f"Deadline digest batch for {len(orgs)} orgs failed: {str(e)}")
+        outcome = "released"
+    else:
+        outcome = "sent"
+    for org in orgs:
+        outcomes[org.id] = outcome
+
+
+async def _send_batch(db, dispatcher: EmailDispatcher, orgs: list, digests: dict, max_listed: int) -> dict:
+    claimed = [
+        {"grant_id": row.id, "organization_id": org.id, "window_days": days, "deadline": row.deadline}
+        for org in orgs for row, days in digests[org.id]
+    ]
+    result = await db.execute(
+        insert(models.DeadlineReminder).returning(models.DeadlineReminder.id, models.DeadlineReminder.organization_id),
+        claimed,
+    )
+    markers = defaultdict(list)
+    for marker_id, org_id in result:
+        markers[org_id].append(marker_id)
+    await db.commit()
+
+    outcomes = {}
+    await _deliver(dispatcher, orgs, digests, max_listed, outcomes)
+
+    by_outcome = defaultdict(list)
+    for org_id, outcome in outcomes.items():
+        by_outcome[outcome].extend(markers[org_id])
+    marker_table = models.DeadlineReminder
+    if by_outcome["released"]:
+        await db.execute(delete(marker_table).where(marker_table.id.in_(by_outcome["released"])))
+    if by_outcome["sent"]:
+        await db.execute(
+            update(marker_table)
+            .where(marker_table.id.in_(by_outcome["sent"]))
+            .values(status="sent", sent_at=datetime.now(timezone.utc))
+        )
+    if by_outcome["rejected"]:
+        await db.execute(update(marker_table).where(marker_table.id.in_(by_outcome["rejected"])).values(status="failed"))
+    # "unknown" claims stay pending: the digest may have gone out, so it is never resent
+    await db.commit()
+
+    counts = defaultdict(int)
+    for outcome in outcomes.values():
+        counts[outcome] += 1
+    return counts
+
+
+async def send_reminders(
+    dispatcher: EmailDispatcher,
+    windows: list | None = None,
+    chunk_size: int | None = None,
+    batch_size: int | None = None,
+    max_listed: int | None = None,
+    dry_run: bool = False,
+) -> dict:
+    # Defaults resolve per call so Settings.configure() overrides apply
+    windows = settings.DEADLINE_REMINDER_WINDOWS if windows is None else windows
+    chunk_size = settings.DEADLINE_REMINDER_CHUNK_SIZE if chunk_size is None else chunk_size
+    batch_size = settings.DEADLINE_REMINDER_BATCH_SIZE if batch_size is None else batch_size
+    max_listed = settings.DEADLINE_REMINDER_MAX_LISTED if max_listed is None else max_listed
+    stats = {"grants": 0, "orgs": 0, "sent": 0, "failed": 0, "rejected": 0, "unknown": 0, "skipped_orgs": 0}
+    if not windows:
+        return stats
+    # deadline is stored as naive UTC
+    now = datetime.utcnow()
+    async with AsyncSessionLocal() as db:
+        digests = defaultdict(list)
+        async for due in scan_due(db, now, windows, chunk_size):
+            for row, days in due:
+                digests[row.organization_id].append((row, days))
+        stats["grants"] = sum(len(items) for items in digests.values())
+
+        org_ids = sorted(digests)
+        for start in range(0, len(org_ids), batch_size):
+            batch_ids = org_ids[start:start + batch_size]
+            orgs = (await db.execute(
+                select(models.Organization.id, models.Organization.name, models.Organization.contact_email,
+                       models.Organization.status)
+                .where(models.Organization.id.in_(batch_ids))
+            )).all()
+            # Left unclaimed, so an org that is reinstated still gets its reminder on a later run
+            recipients = [
+                org for org in orgs
+                if org.contact_email and (org.status or "").lower() not in SKIPPED_ORG_STATUSES
+            ]
+            stats["skipped_orgs"] += len(batch_ids) - len(recipients)
+            stats["orgs"] += len(recipients)
+            if not recipients or dry_run:
+                continue
+            counts = await _send_batch(db, dispatcher, recipients, digests, max_listed)
+            stats["sent"] += counts["sent"]
+            stats["failed"] += counts["released"]
+            stats["rejected"] += counts["rejected"]
+            stats["unknown"] += counts["unknown"]
+    return stats
+
+
+async def run(api_url: str, dry_run: bool = False, **options) -> dict | None:
+    engine = get_async_engine()
+    async with engine.connect() as lock_conn:
+        lock_conn = await lock_conn.execution_options(isolation_level="AUTOCOMMIT")
+        postgres = lock_conn.dialect.name == "postgresql"
+        if postgres and not await lock_conn.scalar(
+            text("SELECT pg_try_advisory_lock(:key)"), {"key": REMINDER_LOCK_KEY}
+        ):
+            logger.info("Another reminder run holds the lock; skipping")
+            return None
+        dispatcher = EmailDispatcher(api_url=api_url)
+        try:
+            started = time.perf_counter()
+            stats = await send_reminders(dispatcher, dry_run=dry_run, **options)
+            outcome = "dry run" if dry_run else (
+                f"{stats['sent']} digests sent, {stats['failed']} failed, {stats['rejected']} rejected, "
+                f"{stats['unknown']} unconfirmed"
+            )
+            logger.info(
+                f"{stats['grants']} grants due across {stats['orgs']} orgs ({stats['skipped_orgs']} skipped); "
+                f"{outcome} in {time.perf_counter() - started:.1f}s"
+            )
+            return stats
+        finally:
+            await dispatcher.aclose()
+            if postgres:
+                await lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": REMINDER_LOCK_KEY})
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--windows", type=int, nargs="+", default=settings.DEADLINE_REMINDER_WINDOWS,
+                        help="days before the deadline to remind at")
+    parser.add_argument("--chunk-size", type=int, default=settings.DEADLINE_REMINDER_CHUNK_SIZE)
+    parser.add_argument("--batch-size", type=int, default=settings.DEADLINE_REMINDER_BATCH_SIZE)
+    parser.add_argument("--brevo-url", default=settings.BREVO_API_URL)
+    parser.add_argument("--dry-run", action="store_true", help="count due digests without sending or marking")
+    parser.add_argument("--every", type=float, help="repeat every N seconds instead of running once")
+    args = parser.parse_args()
+
+    try:
+        while True:
+            await run(
+                args.brevo_url, dry_run=args.dry_run, windows=sorted(set(args.windows)),
+                chunk_size=args.chunk_size, batch_size=min(args.batch_size, 1000),
+            )
+            if not args.every:
+                break
+            await asyncio.sleep(args.every)
+    finally:
+        await dispose_async_engine()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
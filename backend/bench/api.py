@@ -0,0 +1,337 @@
+"""HTTP load benchmark for the org portal API.
+
+Run from backend/:
+    python -m bench.api --database-url sqlite:////tmp/relivo-bench.db --orgs 20 --grants 200 \
+        --concurrency 16 --requests 400
+
+Seeds N orgs with M grants each (idempotent: previous bench-*@bench.invalid rows are replaced),
+starts uvicorn against that database with Brevo pointed at a local mock server, then drives
+login, dashboard, grant detail and grant create at the given concurrency and reports latency
+percentiles and throughput per scenario. --skip-seed reuses the bench orgs already in the database.
+
+--base-url targets an already running server instead (it must use the same --database-url).
+--save writes the results as JSON; --compare fails with exit status 1 when any scenario's p95
+regresses by more than --tolerance against such a file.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+BENCH_EMAIL_DOMAIN = "bench.invalid"
+BENCH_PASSWORD = "bench-password-123"
+SCENARIOS = ("login", "dashboard", "grant_detail", "create")
+SEED_BATCH_SIZE = 1000
+
+
+class _MockBrevoHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("content-length") or 0))
+        if self.latency:
+            time.sleep(self.latency)
+        body = json.dumps({"messageId": f"<bench-{time.monotonic_ns()}@mock>"}).encode()
+        self.send_response(201)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_mock_brevo(latency_ms: float) -> tuple[ThreadingHTTPServer, str]:
+    _MockBrevoHandler.latency = latency_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _MockBrevoHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v3/smtp/email"
+
+
+def seed(orgs: int, grants_per_org: int) -> dict:
+    # Imported late: settings are read from the environment prepared by main()
+    from sqlalchemy import delete, insert, select
+
+    from app.core import security
+    from app.db import models
+    from app.db.migrations import run_migrations
+    from app.db.session import SessionLocal
+
+    run_migrations()
+    # One hash shared by every bench org; hashing per row would dominate the seed time
+    password_hash = security._hash(BENCH_PASSWORD)
+    pattern = f"bench-%@{BENCH_EMAIL_DOMAIN}"
+
+    with SessionLocal() as db:
+        org_ids = select(models.Organization.id).where(models.Organization.contact_email.like(pattern))
+        db.execute(delete(models.Grant).where(models.Grant.organization_id.in_(org_ids)))
+        db.execute(delete(models.Organization).where(models.Organization.contact_email.like(pattern)))
+        db.execute(delete(models.User).where(models.User.email.like(pattern)))
+
+        grant_ids = {}
+        deadline = datetime.utcnow() + timedelta(days=90)
+        for i in range(orgs):
+            email = f"bench-{i}@{BENCH_EMAIL_DOMAIN}"
+            user = models.User(email=email, hashed_password=password_hash, full_name=f"Bench Org {i}",
+                               role="organization", is_verified=True)
+            db.add(user)
+            db.flush()
+            org = models.Organization(user_id=user.id, name=f"Bench Org {i}", contact_email=email,
+                                      password=password_hash, country="Bench", type="ngo", status="active",
+                                      must_change_password=False)
+            db.add(org)
+            db.flush()
+
+            rows = [{
+                "title": f"Bench grant {i}-{n}",
+                "organizer": org.name,
+                "apply_url": "https://example.org/apply",
+                "deadline": deadline + timedelta(days=n % 60),
+                "description": "Benchmark grant " * 20,
+                "eligibility": "Open to everyone",
+                "category": random.choice(("education", "health", "housing", "livelihood")),
+                "source": "manual",
+                "is_verified": True,
+                "is_active": n % 7 != 0,
+                "organization_id": org.id,
+                "creator_id": user.id,
+                "created_by_type": "ORGANIZATION",
+                "created_by_id": org.id,
+                "status": "DELETION_PENDING" if n % 20 == 0 else "LIVE",
+            } for n in range(grants_per_org)]
+            for start in range(0, len(rows), SEED_BATCH_SIZE):
+                db.execute(insert(models.Grant), rows[start:start + SEED_BATCH_SIZE])
+
+        db.commit()
+        return _bench_grant_ids(db)
+
+
+def load_existing() -> dict:
+    # --skip-seed: reuse the orgs and grants a previous run left in the database
+    from app.db.migrations import run_migrations
+    from app.db.session import SessionLocal
+
+    run_migrations()
+    with SessionLocal() as db:
+        return _bench_grant_ids(db)
+
+
+def _bench_grant_ids(db) -> dict:
+    from sqlalchemy import select
+
+    from app.db import models
+
+    rows = db.execute(
+        select(models.Organization.contact_email, models.Grant.id)
+        .outerjoin(models.Grant, models.Grant.organization_id == models.Organization.id)
+        .where(models.Organization.contact_email.like(f"bench-%@{BENCH_EMAIL_DOMAIN}"))
+        .order_by(models.Organization.id, models.Grant.id)
+    )
+    grant_ids = {}
+    for email, grant_id in rows:
+        ids = grant_ids.setdefault(email, [])
+        if grant_id is not None:
+            ids.append(grant_id)
+    return grant_ids
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers: int) -> tuple[subprocess.Popen, str]:
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--workers", str(workers),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env=os.environ.copy(),
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with status {process.returncode}")
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1).status_code == 200:
+                return process, base_url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("uvicorn did not become healthy within 60s")
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+async def run_scenario(client: httpx.AsyncClient, name: str, sessions: list, requests: int, concurrency: int) -> dict:
+    latencies = []
+    errors = 0
+    remaining = requests
+
+    def build_request():
+        email, token, grant_ids = random.choice(sessions)
+        headers = {"Authorization": f"Bearer {token}"}
+        if name == "login":
+            return client.build_request("POST", "/api/auth/login", data={"email": email, "password": BENCH_PASSWORD})
+        if name == "dashboard":
+            return client.build_request("GET", "/api/dashboard_data", headers=headers)
+        if name == "grant_detail":
+            return client.build_request("GET", f"/api/grants/{random.choice(grant_ids)}", headers=headers)
+        return client.build_request("POST", "/api/org/grants/create", headers=headers, data={
+            "title": f"Bench created {time.monotonic_ns()}",
+            "apply_url": "https://example.org/apply",
+            "deadline": "2031-01-01",
+            "category": "education",
+        })
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            request = build_request()
+            started = time.perf_counter()
+            try:
+                response = await client.send(request)
+                await response.aread()
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            if not ok:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round((latencies[-1] if latencies else 0) * 1000, 2),
+    }
+
+
+async def drive(base_url: str, grant_ids: dict, args) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        sessions = []
+        for email, ids in grant_ids.items():
+            response = await client.post("/api/auth/login", data={"email": email, "password": BENCH_PASSWORD})
+            response.raise_for_status()
+            sessions.append((email, response.json()["access_token"], ids or [0]))
+
+        results = {}
+        for name in args.scenarios:
+            if args.warmup:
+                await run_scenario(client, name, sessions, args.warmup, args.concurrency)
+            results[name] = await run_scenario(client, name, sessions, args.requests, args.concurrency)
+        return results
+
+
+def report(results: dict):
+    print(f"{'scenario':<14}{'requests':>9}{'errors':>8}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for name, r in results.items():
+        print(f"{name:<14}{r['requests']:>9}{r['errors']:>8}{r['rps']:>9}"
+              f"{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}{r['max_ms']:>9}")
+
+
+def compare(results: dict, baseline_path: str, tolerance: float) -> bool:
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+    ok = True
+    for name, r in results.items():
+        if name not in baseline or not baseline[name]["p95_ms"]:
+            continue
+        change = r["p95_ms"] / baseline[name]["p95_ms"] - 1
+        status = "REGRESSION" if change > tolerance else "ok"
+        ok = ok and status == "ok"
+        print(f"{name:<14} p95 {baseline[name]['p95_ms']:>8} -> {r['p95_ms']:>8} ms ({change:+.0%}) {status}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.getenv("BENCH_DATABASE_URL", "sqlite:////tmp/relivo-bench.db"))
+    parser.add_argument("--orgs", type=int, default=20)
+    parser.add_argument("--grants", type=int, default=200, help="grants per org")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=400, help="measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=50, help="unmeasured requests per scenario")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--base-url", help="benchmark a running server instead of starting one")
+    parser.add_argument("--brevo-latency-ms", type=float, default=50.0, help="mock Brevo response delay")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--skip-seed", action="store_true")
+    parser.add_argument("--save", help="write results as JSON")
+    parser.add_argument("--compare", help="baseline JSON from --save")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 increase for --compare")
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    mock, brevo_url = start_mock_brevo(args.brevo_latency_ms)
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ["BREVO_API_URL"] = brevo_url
+    os.environ.setdefault("MAIL_PASSWORD", "bench")
+    # The bench logs in far more often than the auth throttles allow
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+    if args.skip_seed:
+        grant_ids = load_existing()
+        print(f"using {len(grant_ids)} existing bench orgs in {args.database_url}")
+        if not grant_ids:
+            parser.error("no bench orgs in the database; run once without --skip-seed")
+    else:
+        print(f"seeding {args.orgs} orgs x {args.grants} grants into {args.database_url}")
+        started = time.perf_counter()
+        grant_ids = seed(args.orgs, args.grants)
+        print(f"seeded in {time.perf_counter() - started:.1f}s")
+        if not grant_ids:
+            parser.error("no bench orgs to log in as; pass --orgs 1 or more")
+
+    server = None
+    base_url = args.base_url
+    if not base_url:
+        server, base_url = start_server(args.workers)
+    try:
+        results = asyncio.run(drive(base_url, grant_ids, args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+        mock.shutdown()
+
+    report(results)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+    if args.compare and not compare(results, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Argon2 throughput benchmark.
+
+Run from backend/:  python -m bench.hashing --seconds 5 --workers 1 2 4
+Honours ARGON2_TIME_COST / ARGON2_MEMORY_COST / ARGON2_PARALLELISM from the environment.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core import security
+from app.core.config import settings
+
+
+def _inline_rate(fn, seconds: float) -> float:
+    done = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        fn()
+        done += 1
+    return done / (time.perf_counter() - started)
+
+
+def _pool_rate(fn, seconds: float, concurrency: int) -> tuple[float, int]:
+    done = 0
+    busy = 0
+    started = time.perf_counter()
+
+    def worker():
+        nonlocal done, busy
+        while time.perf_counter() - started < seconds:
+            try:
+                fn()
+                done += 1
+            except security.HashingBusy:
+                busy += 1
+                time.sleep(0.001)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as threads:
+        for _ in range(concurrency):
+            threads.submit(worker)
+    return done / (time.perf_counter() - started), busy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    stored = security._hash("correct horse battery staple")
+    print(f"argon2 time_cost={settings.ARGON2_TIME_COST or 'default'} "
+          f"memory_cost={settings.ARGON2_MEMORY_COST or 'default'} "
+          f"parallelism={settings.ARGON2_PARALLELISM or 'default'}")
+
+    rate = _inline_rate(lambda: security._verify("correct horse battery staple", stored), args.seconds)
+    print(f"inline       verify (logins/sec, 1 core): {rate:8.1f}")
+    rate = _inline_rate(lambda: security._hash("correct horse battery staple"), args.seconds)
+    print(f"inline       hash   (per sec, 1 core):    {rate:8.1f}")
+
+    for workers in args.workers:
+        settings.HASH_POOL_WORKERS = workers
+        security.shutdown_hashing()
+        # Warm the pool so process spawn time is not counted
+        security.verify_password("correct horse battery staple", stored)
+        rate, busy = _pool_rate(
+            lambda: security.verify_password("correct horse battery staple", stored),
+            args.seconds,
+            concurrency=workers * 4,
+        )
+        print(f"pool x{workers:<3}    verify (logins/sec): {rate:8.1f}  per core: {rate / workers:8.1f}  503s: {busy}")
+    security.shutdown_hashing()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Worker cold-start benchmark.
+
+Run from backend/:  python -m bench.startup --runs 5 --database-url sqlite:////tmp/relivo-bench.db
+
+Each run starts a fresh interpreter that imports app.main, builds the app with create_app() and
+serves a first GET /health straight through ASGI (no server, no lifespan), and reports each phase.
+"fresh" is a worker started without --preload; "forked" builds the app once and times a forked
+child's first request, which is what a worker costs under `gunicorn --preload`. Also lists the
+heavy optional modules that were loaded by the time the first response was sent.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+LAZY_MODULES = ("httpx", "passlib", "jose", "argon2", "asyncpg", "dotenv", "app.db.migrations")
+
+
+async def _first_request(app, path: str = "/health") -> int:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 0), "server": ("bench", 80),
+    }
+    status = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+def probe(fork: bool) -> dict:
+    # Runs inside the child interpreter; times are milliseconds
+    started = time.perf_counter()
+    from app.main import create_app
+    imported = time.perf_counter()
+    app = create_app()
+    built = time.perf_counter()
+    result = {"import_ms": (imported - started) * 1000, "create_app_ms": (built - imported) * 1000}
+
+    if fork:
+        read_fd, write_fd = os.pipe()
+        forked = time.perf_counter()
+        pid = os.fork()
+        if pid == 0:
+            from app.db import session
+            session.dispose_engines(close=False)
+            status = asyncio.run(_first_request(app))
+            payload = {"fork_to_response_ms": (time.perf_counter() - forked) * 1000, "status": status}
+            os.write(write_fd, json.dumps(payload).encode())
+            os._exit(0)
+        os.close(write_fd)
+        with os.fdopen(read_fd) as pipe:
+            result.update(json.loads(pipe.read()))
+        os.waitpid(pid, 0)
+    else:
+        before = time.perf_counter()
+        result["status"] = asyncio.run(_first_request(app))
+        result["first_request_ms"] = (time.perf_counter() - before) * 1000
+    result["loaded"] = [name for name in LAZY_MODULES if name in sys.modules]
+    return result
+
+
+def run_once(mode: str) -> dict:
+    command = [sys.executable, "-m", "bench.startup", "--probe"] + (["--fork"] if mode == "forked" else [])
+    started = time.perf_counter()
+    output = subprocess.run(
+        command, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env=os.environ.copy(), check=True, capture_output=True, text=True,
+    ).stdout
+    wall_ms = (time.perf_counter() - started) * 1000
+    result = json.loads(output.strip().splitlines()[-1])
+    result["process_ms"] = wall_ms
+    return result
+
+
+def summarize(runs: list, key: str) -> str:
+    values = [run[key] for run in runs if key in run]
+    if not values:
+        return "-"
+    return f"{statistics.median(values):8.1f} (min {min(values):.1f})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--database-url", help="defaults to DATABASE_URL")
+    parser.add_argument("--modes", nargs="+", choices=("fresh", "forked"), default=["fresh", "forked"])
+    parser.add_argument("--save", help="write results as JSON to this path")
+    parser.add_argument("--probe", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--fork", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.probe:
+        print(json.dumps(probe(args.fork)))
+        return
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    if not os.environ.get("DATABASE_URL"):
+        parser.error("set DATABASE_URL or pass --database-url")
+    # Keep startup side effects out of the measurement
+    os.environ.setdefault("HASH_POOL_WORKERS", "0")
+
+    results = {}
+    for mode in args.modes:
+        runs = [run_once(mode) for _ in range(args.runs)]
+        results[mode] = runs
+        print(f"{mode} worker, median of {args.runs} runs (ms):")
+        keys = ("import_ms", "create_app_ms", "first_request_ms", "process_ms") if mode == "fresh" \
+            else ("fork_to_response_ms",)
+        for key in keys:
+            print(f"  {key:<22}{summarize(runs, key)}")
+        print(f"  loaded after first response: {', '.join(runs[-1]['loaded']) or 'none of ' + ', '.join(LAZY_MODULES)}")
+        if any(run["status"] != 200 for run in runs):
+            print(f"  warning: /health returned {sorted({run['status'] for run in runs})}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"runs": args.runs, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+"""Gunicorn settings. Run from backend/:  gunicorn -c gunicorn.conf.py
+
+The app is built once in the master (preload_app) and workers fork with it already imported, so a
+worker's boot is a fork plus the startup hooks. Nothing connects to the database while the app is
+built; post_fork still drops any pool a master-side hook may have opened so workers never share a
+connection.
+"""
+import os
+
+wsgi_app = "app.main:create_app()"
+worker_class = "uvicorn.workers.UvicornWorker"
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", 2))
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").strip().lower() in ("1", "true", "yes", "on")
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 60))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 5))
+
+
+def post_fork(server, worker):
+    from app.db import replicas, session
+
+    session.dispose_engines(close=False)
+    replicas.dispose_after_fork()
@@ -0,0 +1,43 @@
+import os
+import tempfile
+
+# Settings are read at import, so the environment has to be in place before anything imports app
+_tmpdir = tempfile.mkdtemp(prefix="relivo-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmpdir}/test.db"
+os.environ["HASH_POOL_WORKERS"] = "0"
+os.environ["EMAIL_OUTBOX_INPROCESS"] = "false"
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ["BREVO_API_URL"] = "http://127.0.0.1:9/unused"
+os.environ["CACHE_URL"] = ""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.db import models
+from app.db.session import SessionLocal
+from app.main import create_app
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(create_app()) as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="session")
+def org(client):
+    # One active organization shared by the session; tests create the grants they need
+    response = client.post("/api/auth/register", data={
+        "name": "Test Org", "contact_email": "org@example.org", "password": "pw123456",
+        "country": "KE", "org_type": "ngo",
+    })
+    assert response.status_code == 200, response.text
+    with SessionLocal() as db:
+        record = db.query(models.Organization).filter_by(contact_email="org@example.org").one()
+        record.status = "active"
+        db.commit()
+        org_id = record.id
+
+    response = client.post("/api/auth/login", data={"email": "org@example.org", "password": "pw123456"})
+    assert response.status_code == 200, response.text
+    return {"id": org_id, "headers": {"Authorization": f"Bearer {response.json()['access_token']}"}}
@@ -0,0 +1,17 @@
+from app.core.cache import RedisBackend, TieredCache, build_shared_backend
+
+# Nothing listens on port 1, so every command fails the way it does during a Redis outage
+UNREACHABLE_REDIS = "redis://127.0.0.1:1/0"
+
+
+def test_redis_url_builds_the_redis_backend():
+    assert isinstance(build_shared_backend(UNREACHABLE_REDIS), RedisBackend)
+
+
+def test_unreachable_redis_degrades_to_the_local_tier():
+    cache = TieredCache("test", maxsize=10, ttl=30, local_ttl=5, shared=RedisBackend(UNREACHABLE_REDIS))
+    assert cache.get(1) is None
+    cache.set(1, {"name": "Org"})
+    assert cache.get(1) == {"name": "Org"}
+    cache.invalidate(1)
+    assert cache.get(1) is None
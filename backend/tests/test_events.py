@@ -0,0 +1,25 @@
+import pytest
+
+from app.core import tokens
+
+
+def test_stream_ticket_carries_the_session(client, org):
+    response = client.post("/api/org/grants/events/ticket", headers=org["headers"])
+    assert response.status_code == 200, response.text
+    bearer = org["headers"]["Authorization"].split(" ")[1]
+    session = tokens.decode_token(bearer)
+    claims = tokens.decode_stream_ticket(response.json()["ticket"])
+    assert (claims.org_id, claims.jti, claims.version) == (org["id"], session.jti, session.version)
+    assert claims.expires_at == session.expires_at
+
+
+def test_events_accepts_only_a_ticket(client, org):
+    bearer = org["headers"]["Authorization"].split(" ")[1]
+    assert client.get("/api/org/grants/events", params={"ticket": bearer}).status_code == 401
+    assert client.get("/api/org/grants/events", headers=org["headers"]).status_code == 422
+
+
+def test_ticket_is_not_a_bearer_token(client, org):
+    ticket = client.post("/api/org/grants/events/ticket", headers=org["headers"]).json()["ticket"]
+    with pytest.raises(tokens.InvalidToken):
+        tokens.decode_token(ticket)
@@ -0,0 +1,34 @@
+from app.core.query_profiler import QueryBudgetExceeded, query_budget
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def grants(client, org):
+    for i in range(30):
+        response = client.post("/api/org/grants/create", headers=org["headers"], data={
+            "title": f"Grant {i}", "apply_url": "https://example.org/apply", "category": "education",
+        })
+        assert response.status_code == 200, response.text
+
+
+def test_dashboard_query_count_does_not_grow_with_grants(client, org, grants):
+    client.get("/api/dashboard_data", headers=org["headers"])
+    with query_budget(3, max_repeats=1):
+        response = client.get("/api/dashboard_data", headers=org["headers"])
+    assert response.status_code == 200
+    assert response.json()["total_grants"] >= 30
+
+
+def test_grant_list_pages_within_budget(client, org, grants):
+    first = client.get("/api/org/grants?limit=10", headers=org["headers"]).json()
+    with query_budget(1, max_repeats=1):
+        response = client.get(f"/api/org/grants?limit=10&cursor={first['next_cursor']}", headers=org["headers"])
+    assert response.status_code == 200
+    assert len(response.json()["grants"]) == 10
+
+
+def test_budget_reports_the_statements(client, org, grants):
+    with pytest.raises(QueryBudgetExceeded, match="budget is 0"):
+        with query_budget(0):
+            client.get("/api/org/grants?limit=5", headers=org["headers"])
@@ -0,0 +1,20 @@
+from app.core.rate_limit import LocalBackend, RedisBackend, build_backend
+
+# Nothing listens on port 1, so every command fails the way it does during a Redis outage
+UNREACHABLE_REDIS = "redis://127.0.0.1:1/0"
+
+
+def test_redis_url_builds_the_redis_backend():
+    assert isinstance(build_backend(UNREACHABLE_REDIS), RedisBackend)
+    assert isinstance(build_backend(""), LocalBackend)
+
+
+def test_unreachable_redis_fails_open():
+    assert RedisBackend(UNREACHABLE_REDIS).take("login:203.0.113.7", capacity=1, period=60) == 0.0
+
+
+def test_local_backend_limits_after_capacity():
+    backend = LocalBackend()
+    assert backend.take("otp:a@example.com", capacity=2, period=60) == 0.0
+    assert backend.take("otp:a@example.com", capacity=2, period=60) == 0.0
+    assert backend.take("otp:a@example.com", capacity=2, period=60) > 0
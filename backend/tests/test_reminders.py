@@ -0,0 +1,148 @@
+import asyncio
+import json
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.core.email_dispatcher import EmailDeliveryError
+from app.db import models, session
+from app.db.session import SessionLocal
+from app.workers import reminders
+
+
+class _BrevoStandIn(BaseHTTPRequestHandler):
+    requests = []
+    # Any batch mentioning this address is refused with a 400, as Brevo does for an invalid recipient
+    reject = None
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.requests.append(json.loads(body))
+        rejected = self.reject and self.reject.encode() in body
+        reply = json.dumps({"code": "invalid_parameter"} if rejected else {"messageIds": ["<test@stand-in>"]}).encode()
+        self.send_response(400 if rejected else 201)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(reply)))
+        self.end_headers()
+        self.wfile.write(reply)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def brevo():
+    _BrevoStandIn.requests = []
+    _BrevoStandIn.reject = None
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _BrevoStandIn)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/v3/smtp/email", _BrevoStandIn.requests
+    server.shutdown()
+    server.server_close()
+
+
+def _run(api_url: str) -> dict:
+    async def go():
+        try:
+            return await reminders.run(api_url)
+        finally:
+            await session.dispose_async_engine()
+
+    # The async pool belongs to the TestClient's loop; start this run on a fresh one
+    session.dispose_engines()
+    return asyncio.run(go())
+
+
+def _add_grant(db, org_id: int, title: str, deadline: datetime):
+    db.add(models.Grant(
+        title=title, organizer="Test Org", apply_url="https://example.org/apply", deadline=deadline,
+        is_verified=True, is_active=True, organization_id=org_id, status="LIVE",
+    ))
+
+
+def test_reminders_send_one_digest_per_org_once(client, org, brevo):
+    api_url, received = brevo
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        for title, days in (("Closing tomorrow", 0.5), ("Closing this week", 5), ("Closing next month", 30)):
+            _add_grant(db, org["id"], title, now + timedelta(days=days))
+        db.commit()
+
+    stats = _run(api_url)
+    assert stats["sent"] == 1 and stats["failed"] == 0
+    assert stats["grants"] == 2
+    assert len(received) == 1
+    versions = received[0]["messageVersions"]
+    assert [version["to"][0]["email"] for version in versions] == ["org@example.org"]
+    assert "Closing tomorrow" in json.dumps(versions[0])
+    assert "Closing next month" not in json.dumps(versions[0])
+
+    with SessionLocal() as db:
+        markers = db.query(models.DeadlineReminder).filter_by(organization_id=org["id"]).all()
+    assert sorted(marker.window_days for marker in markers) == [1, 7]
+    assert {marker.status for marker in markers} == {"sent"}
+
+    # A second run finds everything already reminded and sends nothing
+    assert _run(api_url)["sent"] == 0
+    assert len(received) == 1
+
+
+def test_rejected_org_is_isolated_and_marked_failed(client, brevo):
+    api_url, received = brevo
+    _BrevoStandIn.reject = "bad@example.org"
+    emails = ["good1@example.org", "bad@example.org", "good2@example.org"]
+    with SessionLocal() as db:
+        org_ids = []
+        for n, email in enumerate(emails):
+            record = models.Organization(user_id=1000 + n, name=f"Batch Org {n}", contact_email=email, status="active")
+            db.add(record)
+            db.flush()
+            _add_grant(db, record.id, f"Batch grant {n}", datetime.utcnow() + timedelta(days=3))
+            org_ids.append(record.id)
+        db.commit()
+
+    stats = _run(api_url)
+    assert (stats["sent"], stats["rejected"], stats["failed"]) == (2, 1, 0)
+    # The full batch, then halves until the bad digest is alone
+    assert len(received) > 1
+    delivered = {version["to"][0]["email"] for request in received for version in request["messageVersions"]}
+    assert set(emails) <= delivered
+
+    with SessionLocal() as db:
+        statuses = dict(db.query(models.DeadlineReminder.organization_id, models.DeadlineReminder.status)
+                        .filter(models.DeadlineReminder.organization_id.in_(org_ids)))
+    assert statuses == {org_ids[0]: "sent", org_ids[1]: "failed", org_ids[2]: "sent"}
+
+    # The rejected digest is not retried on every run
+    sent_before = len(received)
+    assert _run(api_url)["rejected"] == 0
+    assert len(received) == sent_before
+
+
+def test_unconfirmed_send_keeps_the_claim(client, org):
+    class TimingOut:
+        calls = 0
+
+        async def deliver(self, payload, url=None, retry_ambiguous=True):
+            TimingOut.calls += 1
+            raise EmailDeliveryError("Brevo transport error: ReadTimeout", retryable=True, ambiguous=True)
+
+    with SessionLocal() as db:
+        _add_grant(db, org["id"], "Closing soon, timed out", datetime.utcnow() + timedelta(hours=6))
+        db.commit()
+
+    async def go():
+        try:
+            return await reminders.send_reminders(TimingOut(), windows=[1, 7])
+        finally:
+            await session.dispose_async_engine()
+
+    session.dispose_engines()
+    assert asyncio.run(go())["unknown"] == 1
+    # The claim stays, so a rerun does not risk sending the digest twice
+    session.dispose_engines()
+    assert asyncio.run(go())["orgs"] == 0
+    assert TimingOut.calls == 1
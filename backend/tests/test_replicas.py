@@ -0,0 +1,14 @@
+import asyncio
+
+from app.core import cache
+from app.db import replicas
+
+# Nothing listens on port 1, so every command fails the way it does during a Redis outage
+UNREACHABLE_REDIS = "redis://127.0.0.1:1/0"
+
+
+def test_unreadable_pin_routes_reads_to_the_primary(monkeypatch):
+    monkeypatch.setattr(cache, "shared_backend", cache.RedisBackend(UNREACHABLE_REDIS))
+    monkeypatch.setattr(replicas, "replicas", [replicas.Replica(0, "sqlite:///unused.db")])
+    asyncio.run(replicas.pin_primary(1))
+    assert asyncio.run(replicas._is_pinned(2)) is True
@@ -2,6 +2,10 @@ checkAuth();
 
 let allGrants = [];
 let currentOrg = {};
+let nextCursor = null;
+let trashNextCursor = null;
+let grantEvents = null;
+let grantEventsConnectedBefore = false;
 
 async function loadDashboard() {
     try {
@@ -20,15 +24,14 @@ async function loadDashboard() {
         const data = await response.json();
         allGrants = data.grants || [];
         currentOrg = data.org || {};
+        nextCursor = data.next_cursor || null;
+        trashNextCursor = data.trash_next_cursor || null;
 
         // Update Header Data
         document.getElementById('orgName').textContent = currentOrg.name;
         document.getElementById('orgInfo').textContent = `${currentOrg.contact_email} • ${currentOrg.country}`;
 
-        // Update Stats
-        document.getElementById('totalGrants').textContent = data.total_grants;
-        document.getElementById('activeGrants').textContent = data.active_grants;
-        document.getElementById('inactiveGrants').textContent = data.inactive_grants;
+        updateStats(data);
 
         renderGrants();
         renderPendingGrants();
@@ -41,6 +44,79 @@ async function loadDashboard() {
     }
 }
 
+function updateStats(counters) {
+    document.getElementById('totalGrants').textContent = counters.total_grants;
+    document.getElementById('activeGrants').textContent = counters.active_grants;
+    document.getElementById('inactiveGrants').textContent = counters.inactive_grants;
+}
+
+// Live updates: the server pushes each grant change with fresh counters, so the
+// dashboard patches allGrants in place instead of refetching everything
+const GRANT_EVENTS = ['grant.created', 'grant.updated', 'grant.trashed', 'grant.restored', 'grant.purged', 'grants.imported', 'resync'];
+
+async function connectGrantEvents() {
+    if (!window.EventSource) return;
+    // EventSource cannot set an Authorization header, so it opens the stream with a short-lived ticket
+    let ticket;
+    try {
+        const response = await fetch(`${CONFIG.API_BASE_URL}/api/org/grants/events/ticket`, {
+            method: 'POST',
+            headers: getAuthHeaders()
+        });
+        if (response.status === 401) return;
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+        ticket = (await response.json()).ticket;
+    } catch (error) {
+        setTimeout(connectGrantEvents, 5000);
+        return;
+    }
+    const source = new EventSource(`${CONFIG.API_BASE_URL}/api/org/grants/events?ticket=${encodeURIComponent(ticket)}`);
+    grantEvents = source;
+    source.onopen = () => {
+        // Changes made while disconnected were missed
+        if (grantEventsConnectedBefore) loadDashboard();
+        grantEventsConnectedBefore = true;
+    };
+    source.onerror = () => {
+        // The browser would retry with the same ticket, which expires; reconnect with a fresh one
+        source.close();
+        if (grantEvents === source) grantEvents = null;
+        setTimeout(connectGrantEvents, 3000);
+    };
+    GRANT_EVENTS.forEach(type => {
+        source.addEventListener(type, e => applyGrantEvent(JSON.parse(e.data)));
+    });
+}
+
+function liveUpdates() {
+    return grantEvents && grantEvents.readyState === EventSource.OPEN;
+}
+
+function upsertGrant(grant) {
+    const index = allGrants.findIndex(g => g.id === grant.id);
+    if (index === -1) allGrants.unshift(grant);
+    else allGrants[index] = grant;
+}
+
+function applyGrantEvent(event) {
+    if (event.type === 'resync' || event.type === 'grants.imported') {
+        loadDashboard();
+        return;
+    }
+    const ids = new Set(event.ids);
+    if (event.type === 'grant.purged') {
+        allGrants = allGrants.filter(g => !ids.has(g.id));
+    } else if (event.grants) {
+        event.grants.forEach(upsertGrant);
+    } else {
+        const status = event.type === 'grant.trashed' ? 'DELETION_PENDING' : 'LIVE';
+        allGrants.forEach(g => { if (ids.has(g.id)) g.status = status; });
+    }
+    if (event.counters) updateStats(event.counters);
+    renderGrants();
+    renderPendingGrants();
+}
+
 function handleStatusAlerts(status) {
     const statusLower = status ? status.toLowerCase() : 'pending';
     const container = document.querySelector('.dashboard-nav');
@@ -86,6 +162,7 @@ function renderGrants() {
             list.appendChild(card);
         });
     }
+    appendLoadMore(list, nextCursor, false);
     if (typeof lucide !== 'undefined') lucide.createIcons();
 }
 
@@ -103,9 +180,44 @@ function renderPendingGrants() {
             list.appendChild(card);
         });
     }
+    appendLoadMore(list, trashNextCursor, true);
     if (typeof lucide !== 'undefined') lucide.createIcons();
 }
 
+function appendLoadMore(list, cursor, trash) {
+    if (!cursor) return;
+    const wrapper = document.createElement('div');
+    wrapper.style.cssText = 'grid-column: 1/-1; text-align: center; padding: 16px;';
+    wrapper.innerHTML = `
+        <button class="btn ghost btn-sm" onclick="loadMoreGrants(${trash})">
+            <i data-lucide="chevrons-down"></i> Load more
+        </button>`;
+    list.appendChild(wrapper);
+}
+
+// Fetch the next keyset page for the active workspace or the trash tab
+async function loadMoreGrants(trash) {
+    const cursor = trash ? trashNextCursor : nextCursor;
+    if (!cursor) return;
+    try {
+        const params = new URLSearchParams({ cursor, trash, view: 'full' });
+        const res = await fetch(`${CONFIG.API_BASE_URL}/api/org/grants?${params}`, {
+            headers: getAuthHeaders()
+        });
+        if (!res.ok) throw new Error('Failed to fetch grants');
+
+        const data = await res.json();
+        allGrants = allGrants.concat(data.grants || []);
+        if (trash) {
+            trashNextCursor = data.next_cursor || null;
+            renderPendingGrants();
+        } else {
+            nextCursor = data.next_cursor || null;
+            renderGrants();
+        }
+    } catch (err) { console.error(err); }
+}
+
 function createGrantCard(grant, isPending) {
     const div = document.createElement('div');
     div.className = 'grant-card';
@@ -241,7 +353,7 @@ async function softDelete(id) {
             method: 'POST',
             headers: getAuthHeaders()
         });
-        if (res.ok) loadDashboard();
+        if (res.ok && !liveUpdates()) loadDashboard();
     } catch (err) { console.error(err); }
 }
 
@@ -251,7 +363,7 @@ async function restoreGrant(id) {
             method: 'POST',
             headers: getAuthHeaders()
         });
-        if (res.ok) loadDashboard();
+        if (res.ok && !liveUpdates()) loadDashboard();
     } catch (err) { console.error(err); }
 }
 
@@ -262,7 +374,7 @@ async function permanentDelete(id) {
             method: 'POST',
             headers: getAuthHeaders()
         });
-        if (res.ok) loadDashboard();
+        if (res.ok && !liveUpdates()) loadDashboard();
     } catch (err) { console.error(err); }
 }
 
@@ -320,8 +432,14 @@ window.onclick = function (event) {
 }
 
 document.getElementById('logoutBtn')?.addEventListener('click', async () => {
+    // Revoke the token server-side; the local copy is dropped either way
+    try {
+        await fetch(`${CONFIG.API_BASE_URL}/api/auth/logout`, { method: 'POST', headers: getAuthHeaders() });
+    } catch (e) { }
+    if (grantEvents) grantEvents.close();
     localStorage.removeItem('org_token');
     window.location.href = 'login.html';
 });
 
 loadDashboard();
+connectGrantEvents();